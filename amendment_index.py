@@ -0,0 +1,114 @@
+import os
+import re
+import sys
+from collections import deque
+
+'''
+### Purpose ###
+    정정공시([기재정정])를 그 정정 대상 공시에 연결하는 색인
+    list.json 의 rm 에 "정" 이 있는 공시는 이후 정정공시([기재정정] 또는 [첨부정정]/[첨부추가])가 제출된 공시이다
+    같은 회사(corp_code), 같은 보고서 제목 안에서 접수 순서대로 짝을 지어, 짝이 하나로 정해지는 [기재정정] 만 원래 공시를 대체한다
+    [첨부정정]/[첨부추가] 는 "정" 표시를 설명할 뿐 대체하지 않으므로, 필터 전의 전체 목록(responses)으로 색인을 만든다
+    짝이 여러 개일 수 있거나(모호), 정정공시가 수집 범위 밖에 있는 공시는 그대로 남긴다
+    usage: python amendment_index.py [responses folder or zip]   (대체 / 모호 / 짝 없는 공시 수 출력)
+'''
+
+FILTERED_FILE = "filtered_B001_list.json"
+CORRECTION_PREFIX = "[기재정정]"
+ATTACHMENT_PREFIXES = ("[첨부정정]", "[첨부추가]")  # explain an amended flag, the filing itself still stands
+AMENDED_FLAG = "정"     # rm flag: a correction of this filing was filed later
+BOND_TYPES = ("전환사채", "교환사채", "신주인수권부사채")
+
+def bond_type(report_nm: str) -> str:
+    '''
+    input: report_nm
+    output: bond type keyword in the title, or the title without its correction prefixes when there is none
+    '''
+    for keyword in BOND_TYPES:
+        if keyword in report_nm: return keyword
+    return report_nm.replace(CORRECTION_PREFIX, "")
+
+def base_title(report_nm: str) -> str:
+    '''title without its leading [..] prefixes; a filing and all of its corrections share it'''
+    return re.sub(r'^(\[[^\]]*\])+', '', report_nm or "").strip()
+
+def is_correction(report: dict) -> bool:
+    return CORRECTION_PREFIX in (report.get("report_nm") or "")
+
+def is_attachment_correction(report: dict) -> bool:
+    report_nm = report.get("report_nm") or ""
+    return any(prefix in report_nm for prefix in ATTACHMENT_PREFIXES)
+
+def is_amended(report: dict) -> bool:
+    return AMENDED_FLAG in (report.get("rm") or "")
+
+class AmendmentIndex:
+    '''
+    Links built from list.json entries alone, so superseded filings are dropped before anything is downloaded.
+    Build it from the unfiltered filings: attachment corrections are what explain many "정" flags.
+    Within one (corp_code, base title), in filing order, each correction or attachment correction explains one earlier
+    flagged filing. It is linked only when exactly one flag is waiting; when several are, the waiting filings are
+    marked ambiguous and kept, and the following corrections stay ambiguous until those flags are used up.
+    Only a [기재정정] linked this way supersedes the filing it explains.
+    '''
+    def __init__(self, reports):
+        self.superseded_by = {} # rcept_no -> rcept_no of the correction that replaced it
+        self.ambiguous = []     # flagged filings whose correction could not be told apart from another's
+        self.unmatched = []     # flagged "정" but no later correction in the reports
+        groups = {}
+        for report in sorted({report.get("rcept_no"): report for report in reports}.values(), key=lambda report: report.get("rcept_no") or ""):
+            groups.setdefault((report.get("corp_code"), base_title(report.get("report_nm"))), []).append(report)
+        for group in groups.values():
+            open_filings = deque()
+            unexplained = 0 # flags of ambiguous filings that no later filing has accounted for yet
+            for report in group:
+                if is_correction(report) or is_attachment_correction(report):
+                    waiting = len(open_filings) + unexplained
+                    if waiting == 1 and open_filings:
+                        explained = open_filings.popleft()
+                        if is_correction(report): self.superseded_by[explained] = report.get("rcept_no")
+                    elif waiting: # several flags wait, or the one left belongs to an earlier ambiguous batch
+                        self.ambiguous.extend(open_filings)
+                        open_filings.clear()
+                        unexplained = waiting - 1
+                if is_amended(report): open_filings.append(report.get("rcept_no"))
+            self.unmatched.extend(open_filings)
+        self.supersedes = {} # rcept_no -> rcept_no it replaced directly
+        for old, new in self.superseded_by.items(): self.supersedes[new] = old
+
+    def is_superseded(self, rcept_no: str) -> bool:
+        return rcept_no in self.superseded_by
+
+    def latest(self, rcept_no: str) -> str:
+        '''last version in the chain of rcept_no'''
+        while rcept_no in self.superseded_by: rcept_no = self.superseded_by[rcept_no]
+        return rcept_no
+
+    def versions(self, rcept_no: str) -> list:
+        '''earlier versions that rcept_no replaces, newest first'''
+        chain = []
+        while rcept_no in self.supersedes:
+            rcept_no = self.supersedes[rcept_no]
+            chain.append(rcept_no)
+        return chain
+
+    def effective(self, reports) -> list:
+        '''reports that no correction replaced, in their given order'''
+        return [report for report in reports if report.get("rcept_no") not in self.superseded_by]
+
+def load_index(source=None) -> AmendmentIndex:
+    '''
+    input: responses folder or zip (fetch_full_B001_list.iter_response_files), default as in iter_filtered_reports
+    output: AmendmentIndex over every collected filing, before any keyword filtering
+    '''
+    from fetch_full_B001_list import iter_response_files, iter_reports, RESPONSES_FOLDER, RESPONSES_ARCHIVE
+
+    if source is None: source = RESPONSES_FOLDER if os.path.isdir(RESPONSES_FOLDER) else RESPONSES_ARCHIVE
+    fields = ("rcept_no", "corp_code", "report_nm", "rm")
+    return AmendmentIndex({field: report.get(field) for field in fields}
+                          for _, f in iter_response_files(source) for report in iter_reports(f))
+
+if __name__ == "__main__":
+    index = load_index(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"{len(index.superseded_by)} superseded, {len(index.ambiguous)} kept as ambiguous, "
+          f"{len(index.unmatched)} flagged {AMENDED_FLAG} without a later correction")
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import threading
+import zipfile
+from io import BytesIO
+
+'''
+### Purpose ###
+    document.xml 원문 zip을 rcept_no 기준으로 로컬 디스크에 보관하는 캐시
+    공시 원문은 접수 후 변하지 않으므로 한 번 받은 파일은 네트워크 호출 없이 재사용한다
+'''
+
+CACHE_DIR = "dart_documents"
+CACHE_MAX_BYTES = 2 * 1024**3  # 2 GB; least recently used archives are evicted beyond this, 0 disables the cache
+
+def is_archive(content: bytes) -> bool:
+    '''True when content is a zip whose central directory can be read; a cut-off transfer fails this'''
+    return content.startswith(b'PK') and zipfile.is_zipfile(BytesIO(content))
+
+class ArchiveCache:
+    '''
+    Directory of <rcept_no>.zip files with a total size cap.
+    A file's mtime is its last use, so eviction removes the least recently used archives first.
+    '''
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None # computed on first write
+
+    def path(self, rcept_no: str) -> str:
+        return os.path.join(self.root, f"{rcept_no}.zip")
+
+    def get(self, rcept_no: str):
+        '''
+        input: rcept_no
+        output: cached zip bytes, or None if the archive is not on disk
+        '''
+        if self.max_bytes <= 0: return None
+        path = self.path(rcept_no)
+        try:
+            with open(path, 'rb') as f: content = f.read()
+            os.utime(path) # mark as recently used
+        except FileNotFoundError:
+            return None
+        return content
+
+    def put(self, rcept_no: str, content: bytes) -> bool:
+        '''
+        input: rcept_no and the downloaded document.xml body
+        output: True if stored. Error responses and truncated archives (anything that is not a readable zip) are never cached
+        '''
+        if self.max_bytes <= 0 or not is_archive(content): return False
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(rcept_no)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f: f.write(content)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path) # atomic, so readers never see a partial archive
+            self._total_bytes = self._current_size() if self._total_bytes is None else self._total_bytes - previous + len(content)
+            if self._total_bytes > self.max_bytes: self._evict()
+        return True
+
+    def fetch(self, rcept_no: str, download) -> bytes:
+        '''
+        input: rcept_no and a download(rcept_no) -> bytes callable used on a cache miss
+        output: zip bytes, served from disk when possible
+        '''
+        content = self.get(rcept_no)
+        if content is None:
+            content = download(rcept_no)
+            self.put(rcept_no, content)
+        return content
+
+    def _entries(self) -> list:
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith('.zip'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _current_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except FileNotFoundError: pass
+            total -= size
+        self._total_bytes = total
+
+_default_cache = None
+
+def default_cache() -> ArchiveCache:
+    '''Shared cache instance used by basics.unpack and get_full_reports'''
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArchiveCache()
+    return _default_cache
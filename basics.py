@@ -1,14 +1,24 @@
-import requests
-import json
 import sys
 import os
 import re
+import threading
+import time
 from datetime import datetime
-from bs4 import BeautifulSoup
-import zipfile
-from io import BytesIO
 
-__all__ = ['resource_dir', 'get_api_key', 'split', 'parse_number', 'parse_date', 'get_reports_range', 'unpack']
+import metrics
+
+# bs4, zipfile and the DART client (requests) are imported inside the functions that use them,
+# so tools that only need the parse helpers start fast; import_budget.py checks this
+
+__all__ = ['resource_dir', 'get_api_key', 'split', 'parse_number', 'parse_date', 'get_reports_range', 'unpack', 'read_tables', 'iter_tables', 'is_attachment', 'parse_tables', 'RateLimiter']
+
+# name -> (BeautifulSoup tree builder, tag kept by parse_only or None for the full tree)
+PARSER_ENGINES = {
+    'html.parser': ('html.parser', None),   # reference parser, pure Python
+    'lxml': ('lxml', None),                 # same tree built by lxml's C parser
+    'lxml-tables': ('lxml', 'table'),       # lxml, building only <table> subtrees
+}
+PARSER = 'html.parser'
 
 def resource_dir() -> str:
     """Return the directory where resources (like config.json) live.
@@ -19,15 +29,10 @@ def resource_dir() -> str:
     return os.path.dirname(os.path.abspath(__file__))
 
 def get_api_key():
-    """Get the current API key directly from JSON file in resource directory"""
-    config_path = os.path.join(resource_dir(), 'config.json')
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config.get('API_KEY', '')
-    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        print(f"Error loading API key from JSON: {e}")
-        return ""
+    """Get an API key from the shared key pool (config.json is read once). Only requests made through the
+    DART client count against a key's quota, so this does not"""
+    from credentials import default_pool
+    return default_pool().peek()
 
 def split(text: str) -> list:
     '''
@@ -62,45 +67,115 @@ def parse_date(text: str) -> str:
     except:
         return "-"
 
-def unpack(rcept_no: str) -> list:
+class RateLimiter:
     '''
-    input: rcept_no
-    output: list of tables in the report
+    Spaces out calls so that at most `rate` of them start per second.
+    Safe to share between threads; rate <= 0 disables the limit.
+    '''
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval: return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+def parse_tables(text: str, parser: str = PARSER, compact: bool = False) -> list:
+    '''
+    input: document text, a PARSER_ENGINES name and whether to return document.Table copies
+    output: list of <table> tags in document order; with compact, Table objects and the soup is freed right away
+    '''
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    features, only = PARSER_ENGINES[parser]
+    soup = BeautifulSoup(text, features, parse_only=SoupStrainer(only) if only else None)
+    if not compact: return soup.find_all('table')
+
+    from document import Table
+    tables = [Table.from_tag(tag) for tag in soup.find_all('table')]
+    # the tree is full of parent/child cycles and would otherwise live until the cyclic GC runs.
+    # BeautifulSoup.decompose() only wipes the root, so each top-level node is decomposed instead
+    for node in list(soup.contents): node.decompose()
+    return tables
+
+def is_attachment(name: str) -> bool:
+    '''
+    input: member name inside a document.xml archive
+    output: True for attachments. The main disclosure is <rcept_no>.xml, attachments are <rcept_no>_<code>.xml
     '''
-    source_download_url = "https://opendart.fss.or.kr/api/document.xml"
-    url = f"{source_download_url}?crtfc_key={get_api_key()}&rcept_no={rcept_no}"
-    response = requests.get(url)
-    
-    all_tables = []
+    return bool(re.match(r'^\d+_\d+\.xml$', os.path.basename(name)))
+
+def iter_tables(content: bytes, verbose: bool = True, parser: str = PARSER, skip_attachments: bool = False,
+                compact: bool = False):
+    '''
+    input: raw document.xml zip bytes; compact yields document.Table copies instead of bs4 tags (see parse_tables)
+    output: yields tables in document order. Each member is only decoded and parsed when the consumer
+            reaches it, so a consumer that stops early never parses the remaining members
+    '''
+    import zipfile
+    from io import BytesIO
+
     try:
-        with zipfile.ZipFile(BytesIO(response.content)) as zf:
+        with zipfile.ZipFile(BytesIO(content)) as zf:
             file_list = zf.namelist()
             for name in file_list:
-                with zf.open(name) as f:
+                if skip_attachments and is_attachment(name): continue
+                metrics.count('archive_members')
+                with metrics.timer('inflate'), zf.open(name) as f:
                     data = f.read()
+                with metrics.timer('decode'):
                     try: text = data.decode('utf-8')
                     except UnicodeDecodeError:
-                        print(f"Error decoding with utf-8: {name}")
+                        metrics.count('decode_fallbacks')
+                        if verbose: print(f"Error decoding with utf-8: {name}")
                         try: text = data.decode('cp949')
                         except UnicodeDecodeError: 
-                            print(f"Error decoding with cp949: {name}")
+                            metrics.count('decode_failures')
+                            if verbose: print(f"Error decoding with cp949: {name}")
+                            else: print("Decoding Error")
                             text = None
+                del data
 
-                    if text is not None:
-                        soup = BeautifulSoup(text, 'html.parser')
-                        tables = soup.find_all('table')
-                        all_tables.extend(tables)
-    except zipfile.BadZipFile: pass
-    return all_tables
+                if text is not None:
+                    with metrics.timer('parse'):
+                        tables = parse_tables(text, parser, compact)
+                    metrics.count('tables_parsed', len(tables))
+                    yield from tables
+    except zipfile.BadZipFile:
+        metrics.count('bad_archives')
+
+def read_tables(content: bytes, verbose: bool = True, parser: str = PARSER, skip_attachments: bool = False,
+                compact: bool = False) -> list:
+    '''
+    input: raw document.xml zip bytes
+    output: list of tables in every file of the archive
+    '''
+    return list(iter_tables(content, verbose, parser, skip_attachments, compact))
+
+def unpack(rcept_no: str):
+    '''
+    input: rcept_no
+    output: document.Document holding the tables in the report
+    '''
+    from archive_cache import default_cache
+    from dart_client import default_client
+    from document import Document
+
+    return Document(iter_tables(default_cache().fetch(rcept_no, default_client().get_document), compact=True))
 
 def get_reports_range(start_date, end_date):
     '''
     input: start_date and end_date in string format %Y%m%d
     output: list of reports between start_date and end_date
     '''
-    base_url = "https://opendart.fss.or.kr/api/list.json"
-    base_params = {
-        'crtfc_key': get_api_key(),
+    from dart_client import default_client
+
+    base_params = { # crtfc_key is added per request by the client's key pool
         'bgn_de': start_date,
         'end_de': end_date,
         'last_reprt_at': 'Y',
@@ -113,10 +188,10 @@ def get_reports_range(start_date, end_date):
     while True: # Iterate through all pages
         params = base_params.copy()
         params['page_no'] = page_no
-        response = requests.get(base_url, params=params)
-        if response.json()['status'] != '000': break
-        results.extend(response.json()['list'])
-        if len(response.json()['list']) >= 100: 
+        data = default_client().get_json('list.json', params) # transient failures retry, then raise instead of ending early
+        if data['status'] != '000': break
+        results.extend(data['list'])
+        if len(data['list']) >= 100: 
             page_no += 1
         else: break
     return results
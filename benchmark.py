@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import timeit
+import zipfile
+
+'''
+### Purpose ###
+    파싱 핫패스 오프라인 마이크로 벤치마크 (네트워크 없이 fixtures/ 의 문서와 responses.zip 만 사용)
+    항목마다 호출 1회당 시간을 재고, 같은 실행에서 잰 REFERENCE_BENCHMARK(저장소 코드를 쓰지 않는 고정 작업) 대비 배율을
+    BASELINE_FILE 에 저장된 배율과 비교한다. 컴퓨터 속도 차이는 배율에서 상쇄되므로 다른 컴퓨터에서도 기준값을 쓸 수 있다
+    usage: python benchmark.py                 (기준 배율보다 REGRESSION_TOLERANCE 배 넘게 느려진 항목이 있으면 exit code 1)
+           python benchmark.py --save          (모든 항목을 한 번에 측정해 기준값으로 저장)
+           python benchmark.py split sub.      (이름에 해당 문자열이 들어간 항목만 실행)
+'''
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "fixtures")
+BASELINE_FILE = os.path.join(FIXTURE_DIR, "benchmark_baseline.json")
+RESPONSES_ARCHIVE = os.path.join(HERE, "responses.zip")
+REGRESSION_TOLERANCE = 1.5  # slower than baseline by more than this factor fails; run-to-run noise is up to ~1.3x
+REFERENCE_BENCHMARK = 'reference[stdlib]' # every timing is compared as a multiple of this one, measured in the same run
+REPEAT = 5                  # best of N timing runs, each about 0.2 s (timeit autorange)
+TITLE_SAMPLE = 5000
+
+DATE_TEXTS = ['2024-03-15', '2024.03.15', '2024년 03월 15일', '2024년 3월 5일', '-', '해당사항 없음', '2024-13-01']
+NUMBER_TEXTS = ['5,000,000,000', '12,345', '-', '1.0', '(주1)', '8,642원', '', '해당사항 없음']
+FUND_NAMES = [
+    '타임폴리오 멀티전략 일반사모투자신탁', '수성자산운용 메자닌 전문투자형 사모투자신탁', '라이노스 신기술사업투자조합 제1호',
+    '신한투자증권 주식회사', '키움증권(주)', '에이치알자산운용 주식회사', '한국투자증권(주)', '미래에셋증권 주식회사',
+    'NH투자증권(주)', 'DS자산운용 DS Mezzanine 일반사모투자신탁', '주식회사 샘플', '알수없는 신기술사업투자조합 제3호',
+]
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f: return f.read()
+
+def sample_reports(limit: int = TITLE_SAMPLE) -> list:
+    '''first `limit` list.json entries of the checked-in responses.zip'''
+    reports = []
+    with zipfile.ZipFile(RESPONSES_ARCHIVE) as archive:
+        for name in sorted(archive.namelist()):
+            if not name.endswith('.json'): continue
+            reports.extend(json.loads(archive.read(name)).get('list', []))
+            if len(reports) >= limit: break
+    return reports[:limit]
+
+# Each benchmark builds its inputs and returns (callable timed without arguments, what one call does)
+
+def bench_reference():
+    '''fixed work that no repo code takes part in, so its time tracks only the machine and the Python build'''
+    reports = sample_reports(1000)
+    titles = [report.get('report_nm') or '' for report in reports]
+    return (lambda: (json.loads(json.dumps(reports, ensure_ascii=False)), sorted(word for title in titles for word in title.split()))), \
+        f"{len(reports)} list.json entries through json and str.split"
+
+def bench_parse_date():
+    from basics import parse_date
+    return (lambda: [parse_date(text) for text in DATE_TEXTS]), f"{len(DATE_TEXTS)} dates"
+
+def bench_parse_number():
+    from basics import parse_number
+    return (lambda: [parse_number(text) for text in NUMBER_TEXTS]), f"{len(NUMBER_TEXTS)} numbers"
+
+def bench_split():
+    from basics import split, read_tables
+    texts = [tr.get_text(' | ', strip=True) for table in read_tables(load_fixture("large_report.zip"), verbose=False) for tr in table.find_all('tr')]
+    return (lambda: [split(text) for text in texts]), f"{len(texts)} rows"
+
+def bench_should_include_report():
+    from fetch_full_B001_list import should_include_report
+    reports = sample_reports()
+    return (lambda: [should_include_report(report) for report in reports]), f"{len(reports)} reports, memo warm"
+
+def bench_report_filter_cold():
+    from fetch_full_B001_list import ReportFilter, EXCLUSION_KEYWORDS, INCLUSION_KEYWORDS
+    reports = sample_reports()
+    return (lambda: ReportFilter(EXCLUSION_KEYWORDS, INCLUSION_KEYWORDS).filter(reports)), f"{len(reports)} reports, new filter"
+
+def bench_fundname_to_corpname():
+    from sub import fundname_to_corpname
+    return (lambda: [fundname_to_corpname(name) for name in FUND_NAMES]), f"{len(FUND_NAMES)} names, memo warm"
+
+def bench_fundname_to_corpname_cold():
+    import sub
+    resolver = sub._resolver or sub.build_resolver()
+    return (lambda: [resolver._resolve(name) for name in FUND_NAMES]), f"{len(FUND_NAMES)} names, no memo"
+
+def bench_fundname_to_corpname_scan():
+    from sub import fundname_to_corpname_scan
+    return (lambda: [fundname_to_corpname_scan(name) for name in FUND_NAMES]), f"{len(FUND_NAMES)} names, reference scan"
+
+def bench_read_tables():
+    from basics import read_tables
+    content = load_fixture("large_report.zip")
+    return (lambda: read_tables(content, verbose=False)), "large_report.zip"
+
+def bench_read_tables_skip_attachments():
+    from basics import read_tables
+    content = load_fixture("large_report.zip")
+    return (lambda: read_tables(content, verbose=False, skip_attachments=True)), "large_report.zip, main member only"
+
+def bench_read_tables_compact():
+    from basics import read_tables
+    content = load_fixture("large_report.zip")
+    return (lambda: read_tables(content, verbose=False, compact=True)), "large_report.zip, compact tables"
+
+def bench_extract_table_data():
+    from basics import read_tables
+    from document import Document
+    from get_full_reports import extract_table_data
+    tables = read_tables(load_fixture("large_report.zip"), verbose=False, compact=True)
+    report = {'report_nm': '주요사항보고서(전환사채권발행결정)'}
+    return (lambda: extract_table_data(report, Document(tables))), "large_report.zip, compact tables"
+
+def bench_finish_extraction():
+    from basics import read_tables
+    from get_full_reports import extract_document, finish_extraction
+    tables = read_tables(load_fixture("large_report.zip"), verbose=False, compact=True)
+    extracted = json.loads(json.dumps(extract_document({'report_nm': '주요사항보고서(전환사채권발행결정)'}, tables)))
+    return (lambda: finish_extraction(extracted)), "large_report.zip, result_cache hit"
+
+def bench_list_fund_participants():
+    from basics import read_tables
+    from document import Document
+    from sub import list_fund_participants
+    tables = read_tables(load_fixture("large_report.zip"), verbose=False, compact=True)
+    return (lambda: list_fund_participants(Document(tables))), "large_report.zip, compact tables"
+
+BENCHMARKS = {
+    REFERENCE_BENCHMARK: bench_reference,
+    'basics.parse_date': bench_parse_date,
+    'basics.parse_number': bench_parse_number,
+    'basics.split': bench_split,
+    'basics.read_tables': bench_read_tables,
+    'basics.read_tables[skip_attachments]': bench_read_tables_skip_attachments,
+    'basics.read_tables[compact]': bench_read_tables_compact,
+    'fetch_full_B001_list.should_include_report': bench_should_include_report,
+    'fetch_full_B001_list.ReportFilter[cold]': bench_report_filter_cold,
+    'sub.fundname_to_corpname': bench_fundname_to_corpname,
+    'sub.fundname_to_corpname[cold]': bench_fundname_to_corpname_cold,
+    'sub.fundname_to_corpname_scan': bench_fundname_to_corpname_scan,
+    'get_full_reports.extract_table_data': bench_extract_table_data,
+    'get_full_reports.finish_extraction[cached]': bench_finish_extraction,
+    'sub.list_fund_participants': bench_list_fund_participants,
+}
+
+def measure(setup) -> tuple:
+    '''
+    input: benchmark setup function
+    output: (best seconds per call, description)
+    '''
+    func, description = setup()
+    func() # warm caches and lazy imports outside the timing
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number, description
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1e-3: return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.1f} us"
+
+def load_baseline() -> dict:
+    '''{name: seconds per call} of one --save run, including REFERENCE_BENCHMARK; empty when there is none'''
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f: baseline = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if REFERENCE_BENCHMARK not in baseline:
+        print(f"{BASELINE_FILE} has no {REFERENCE_BENCHMARK} timing; run with --save to record a new baseline")
+        return {}
+    return baseline
+
+if __name__ == "__main__":
+    import warnings
+    from bs4 import XMLParsedAsHTMLWarning
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+    sys.path.insert(0, HERE)
+
+    save = '--save' in sys.argv
+    selected = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if save and selected:
+        print("--save records every benchmark in one run, so timings in the baseline can be compared; drop the name filters")
+        sys.exit(2)
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+    for name, setup in BENCHMARKS.items():
+        if selected and name != REFERENCE_BENCHMARK and not any(part in name for part in selected): continue
+        seconds, description = measure(setup)
+        results[name] = seconds
+        line = f"{name:45s} {format_time(seconds)}"
+        if name in baseline and name != REFERENCE_BENCHMARK:
+            # relative to the reference of the same run, so a faster or slower machine does not show up as a change
+            expected = baseline[name] / baseline[REFERENCE_BENCHMARK]
+            ratio = seconds / results[REFERENCE_BENCHMARK] / expected
+            if ratio > REGRESSION_TOLERANCE: # confirm next to a fresh reference timing; a busy host slows single runs
+                reference_seconds, _ = measure(BENCHMARKS[REFERENCE_BENCHMARK])
+                ratio = min(ratio, measure(setup)[0] / reference_seconds / expected)
+            if ratio > REGRESSION_TOLERANCE: regressions.append(name)
+            line += f"  {ratio:5.2f}x baseline{'  REGRESSION' if ratio > REGRESSION_TOLERANCE else ''}"
+        print(f"{line}  ({description})")
+
+    if save:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f: json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} timings to {BASELINE_FILE}")
+    elif regressions:
+        print(f"{len(regressions)} regressions beyond {REGRESSION_TOLERANCE}x: {', '.join(regressions)}")
+        sys.exit(1)
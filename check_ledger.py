@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+from job_ledger import JobLedger, FAILED, EXTRACTED
+
+'''
+### Purpose ###
+    job_ledger 의 claim 이 끝나는지 확인하는 코드
+    --retry-failed 한 번은 시작할 때 실패 상태였던 건만 한 번씩 가져가야 한다. 매번 실패하는 건이 있어도 끝나야 한다
+    usage: python check_ledger.py   (문제가 있으면 exit code 1)
+'''
+
+JOBS = ["20240101000001", "20240101000002", "20240101000003"]
+ALWAYS_FAILS = "20240101000002"
+MAX_CLAIMS = 10 # a pass that hands out more than this is not going to end
+
+def run_pass(ledger: JobLedger, retry_failed: bool) -> list:
+    '''
+    input: ledger and pass kind
+    output: rcept_no in the order the pass claimed them; ALWAYS_FAILS fails every time, the others succeed
+    '''
+    claimed = []
+    for rcept_no in ledger.iter_claims("check", retry_failed, batch=1):
+        claimed.append(rcept_no)
+        ledger.mark(rcept_no, FAILED if rcept_no == ALWAYS_FAILS else EXTRACTED, "always fails" if rcept_no == ALWAYS_FAILS else None)
+        if len(claimed) > MAX_CLAIMS: break
+    return claimed
+
+def check() -> list:
+    '''output: list of problems, empty when the ledger behaves'''
+    problems = []
+    with tempfile.TemporaryDirectory() as folder:
+        ledger = JobLedger(os.path.join(folder, "ledger.sqlite3"))
+        ledger.add(JOBS)
+        first = run_pass(ledger, retry_failed=False)
+        if first != JOBS: problems.append(f"first pass claimed {first}, expected {JOBS}")
+        for attempt in (2, 3):
+            retried = run_pass(ledger, retry_failed=True)
+            if retried != [ALWAYS_FAILS]: problems.append(f"retry pass claimed {retried[:MAX_CLAIMS]}, expected [{ALWAYS_FAILS}]")
+            attempts = {rcept_no: count for rcept_no, count, _ in ledger.failures()}
+            if attempts != {ALWAYS_FAILS: attempt}: problems.append(f"after retry pass: failures {attempts}, expected {ALWAYS_FAILS} at {attempt} attempts")
+        ledger.close()
+    return problems
+
+if __name__ == "__main__":
+    problems = check()
+    for problem in problems: print(problem)
+    print("FAIL" if problems else "OK: a retry pass takes each failed job once and ends")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,93 @@
+import glob
+import os
+import sys
+import warnings
+
+from bs4 import XMLParsedAsHTMLWarning
+warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+from basics import read_tables, split, PARSER_ENGINES
+from archive_cache import CACHE_DIR
+from sub import list_fund_participants
+
+'''
+### Purpose ###
+    basics.PARSER_ENGINES 의 각 파서가 기준 파서(html.parser)와 같은 표 데이터를 만드는지 비교하는 코드
+    extract_table_data / list_fund_participants 가 읽는 값(표 텍스트, 행 텍스트, th/te/td 셀)만 비교한다
+    파서마다 compact 표(document.Table)가 원래 태그에서 읽은 값과 같은지도 확인한다
+    usage: python check_parsers.py [document zip ...]   (기본값: 캐시된 원문 zip 전부)
+'''
+
+REFERENCE_PARSER = 'html.parser'
+
+def table_rows(tables: list) -> list:
+    '''
+    input: list of tables
+    output: per table, everything the extractors read from it
+    '''
+    rows = []
+    for table in tables:
+        thead, tbody = table.find('thead'), table.find('tbody')
+        rows.append({
+            'text': table.get_text(),
+            'rows': [tr.get_text(' | ', strip=True) for tr in table.find_all('tr')],
+            'th': [[c.get_text(strip=True) for c in tr.find_all('th')] for tr in thead.find_all('tr')] if thead else None,
+            'te': [[c.get_text(strip=True) for c in tr.find_all('te')] for tr in tbody.find_all('tr')] if tbody else None,
+            'td': [[c.get_text(strip=True) for c in tr.find_all('td')] for tr in tbody.find_all('tr')] if tbody else None,
+        })
+    return rows
+
+def participants(tables: list):
+    try: return list_fund_participants(tables)
+    except Exception as e: return f"error: {type(e).__name__}"
+
+def compare_parsers(content: bytes, parser: str, reference: str = REFERENCE_PARSER) -> list:
+    '''
+    input: document.xml zip bytes and the parser to check
+    output: list of mismatch descriptions, empty when the parser matches the reference
+    '''
+    expected = read_tables(content, verbose=False, parser=reference)
+    actual = read_tables(content, verbose=False, parser=parser)
+    mismatches = []
+    expected_rows, actual_rows = table_rows(expected), table_rows(actual)
+    if len(expected_rows) != len(actual_rows):
+        mismatches.append(f"table count {len(actual_rows)} != {len(expected_rows)}")
+    for idx, (exp, act) in enumerate(zip(expected_rows, actual_rows)):
+        for key in exp:
+            if exp[key] != act[key]: mismatches.append(f"table {idx} {key} differs")
+    if participants(expected) != participants(actual):
+        mismatches.append("list_fund_participants output differs")
+    return mismatches
+
+def compare_compact(content: bytes, parser: str) -> list:
+    '''
+    input: document.xml zip bytes and a parser
+    output: list of mismatch descriptions between document.Table copies and the tags they were built from
+    '''
+    tags = read_tables(content, verbose=False, parser=parser)
+    tables = read_tables(content, verbose=False, parser=parser, compact=True)
+    mismatches = []
+    if len(tags) != len(tables):
+        mismatches.append(f"compact table count {len(tables)} != {len(tags)}")
+    cell_keys = {'th': ('thead', 'th'), 'te': ('tbody', 'te'), 'td': ('tbody', 'td')}
+    for idx, (expected, table) in enumerate(zip(table_rows(tags), tables)):
+        if expected['text'] != table.text: mismatches.append(f"compact table {idx} text differs")
+        if [split(row) for row in expected['rows']] != table.rows: mismatches.append(f"compact table {idx} rows differ")
+        for key, (section, cell_name) in cell_keys.items():
+            if [row for row in expected[key] or [] if row] != table.cells(section, cell_name):
+                mismatches.append(f"compact table {idx} {key} differs")
+    return mismatches
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(CACHE_DIR, "*.zip")))
+    failed = 0
+    for path in paths:
+        with open(path, 'rb') as f: content = f.read()
+        for parser in PARSER_ENGINES:
+            mismatches = compare_compact(content, parser)
+            if parser != REFERENCE_PARSER: mismatches += compare_parsers(content, parser)
+            if mismatches:
+                failed += 1
+                print(f"{os.path.basename(path)} [{parser}]: {'; '.join(mismatches)}")
+    print(f"Checked {len(paths)} documents, {failed} mismatches")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+
+from basics import resource_dir
+
+'''
+### Purpose ###
+    OPENDART API 키 관리 코드
+    config.json 을 한 번만 읽고 여러 개의 키(API_KEYS)를 받아, 키별 호출 수와 요청 제한(020) 응답을 기록하며
+    남은 한도가 가장 많은 키로 요청을 분산한다
+'''
+
+CONFIG_FILE = "config.json"
+DAILY_LIMIT = 20000             # DART calls allowed per key per day
+RATE_LIMIT_COOLDOWN = 300.0     # seconds a key rests after a 020 response
+
+def load_keys() -> list:
+    '''
+    input: -
+    output: API keys from config.json in the resource directory ("API_KEYS" list and/or "API_KEY"),
+            falling back to API_KEYS / API_KEY in config.py
+    '''
+    keys = []
+    config_path = os.path.join(resource_dir(), CONFIG_FILE)
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        keys = list(config.get('API_KEYS', [])) + [config.get('API_KEY', '')]
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        try:
+            import config as config_module
+            keys = list(getattr(config_module, 'API_KEYS', [])) + [getattr(config_module, 'API_KEY', '')]
+        except ImportError:
+            print(f"Error loading API key from JSON: {e}")
+    unique_keys = []
+    for key in keys:
+        if key and key not in unique_keys: unique_keys.append(key)
+    return unique_keys
+
+class KeyPool:
+    '''
+    Hands out the key with the most quota left today.
+    Keys that answered 020 rest for RATE_LIMIT_COOLDOWN seconds; keys that used DAILY_LIMIT calls rest until tomorrow.
+    '''
+    def __init__(self, keys: list, daily_limit: int = DAILY_LIMIT):
+        self.keys = list(keys)
+        self.daily_limit = daily_limit
+        self._lock = threading.Lock()
+        self._day = date.today()
+        self.calls = {key: 0 for key in self.keys}
+        self.rate_limited = {key: 0 for key in self.keys}  # 020 responses today
+        self._resting_until = {key: 0.0 for key in self.keys}
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            for key in self.keys:
+                self.calls[key] = 0
+                self.rate_limited[key] = 0
+                self._resting_until[key] = 0.0
+
+    def available(self) -> bool:
+        '''True if some key has quota left and is not resting'''
+        with self._lock:
+            self._roll_day()
+            now = time.monotonic()
+            return any(self.calls[key] < self.daily_limit and self._resting_until[key] <= now for key in self.keys)
+
+    def acquire(self) -> str:
+        '''
+        input: -
+        output: key to use for one request (counted against its quota); "" when no key is configured.
+                When every key is resting, the one that recovers first
+        '''
+        if not self.keys: return ""
+        with self._lock:
+            key = self._choose()
+            self.calls[key] += 1
+            return key
+
+    def peek(self) -> str:
+        '''Key acquire() would hand out next, without counting a call against it; "" when no key is configured'''
+        if not self.keys: return ""
+        with self._lock: return self._choose()
+
+    def _choose(self) -> str:
+        self._roll_day()
+        now = time.monotonic()
+        ready = [key for key in self.keys if self.calls[key] < self.daily_limit and self._resting_until[key] <= now]
+        if ready: return min(ready, key=lambda k: self.calls[k])
+        return min(self.keys, key=lambda k: (self.calls[k] >= self.daily_limit, self._resting_until[k]))
+
+    def report_rate_limited(self, key: str):
+        '''Record a 020 response for key and rest it'''
+        with self._lock:
+            if key not in self.calls: return
+            self.rate_limited[key] += 1
+            self._resting_until[key] = time.monotonic() + RATE_LIMIT_COOLDOWN
+
+    def usage(self) -> dict:
+        '''{key suffix: {"calls": n, "rate_limited": n}} for logging without exposing full keys'''
+        with self._lock:
+            return {f"...{key[-4:]}": {"calls": self.calls[key], "rate_limited": self.rate_limited[key]} for key in self.keys}
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def default_pool() -> KeyPool:
+    '''Pool shared by every module, built from the config on first use'''
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = KeyPool(load_keys())
+    return _default_pool
+
+def use_keys(keys: list) -> KeyPool:
+    '''Replace the shared pool, e.g. so that a shard of get_full_reports uses only its own keys'''
+    global _default_pool
+    with _default_pool_lock:
+        _default_pool = KeyPool(keys)
+    return _default_pool
@@ -0,0 +1,124 @@
+import os
+import random
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from credentials import default_pool
+
+'''
+### Purpose ###
+    OPENDART API 호출을 한 곳에서 처리하는 클라이언트
+    keep-alive 세션(연결 풀)을 공유하고, 요청마다 timeout 을 걸며,
+    일시적인 실패(DART 020/800/900, HTTP 429/5xx, 네트워크 오류)는 지수 백오프로 재시도한다
+    API 키는 credentials.KeyPool 에서 요청마다 받아 붙이고, 020 응답 시 다른 키로 바로 넘어간다
+'''
+
+BASE_URL = os.environ.get("DART_BASE_URL", "https://opendart.fss.or.kr/api") # e.g. fake_dart.py for offline runs
+TIMEOUT = (5, 60)           # (connect, read) seconds
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0          # seconds; doubles on every retry
+BACKOFF_MAX = 60.0
+POOL_SIZE = 16              # keep-alive connections; at least get_full_reports.CONCURRENCY
+
+STATUS_RATE_LIMITED = "020"
+RETRY_STATUSES = {
+    "020": "요청 제한 초과",
+    "800": "시스템 점검",
+    "900": "정의되지 않은 오류",
+}
+RETRY_HTTP_CODES = {429, 500, 502, 503, 504}
+
+class DartError(Exception):
+    '''Raised when a request still fails after every retry'''
+    def __init__(self, status, message):
+        super().__init__(f"[{status}] {message}")
+        self.status = status
+        self.message = message
+
+def document_status(content: bytes):
+    '''
+    input: document.xml response body
+    output: DART status code of an error body, or None for a zip archive
+    '''
+    if content.startswith(b'PK'): return None
+    match = re.search(rb'<status>\s*(\d+)\s*</status>', content)
+    return match.group(1).decode() if match else "900"
+
+class DartClient:
+    def __init__(self, base_url: str = BASE_URL, timeout=TIMEOUT, max_retries: int = MAX_RETRIES, pool_size: int = POOL_SIZE,
+                 key_pool=None):
+        self.base_url = base_url.rstrip('/')
+        self.key_pool = key_pool # credentials.KeyPool; the shared default_pool() when None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def backoff(self, attempt: int):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+        time.sleep(delay + random.uniform(0, BACKOFF_BASE)) # jitter so parallel threads do not retry in lockstep
+
+    def request(self, endpoint: str, params: dict, decode):
+        '''
+        input: endpoint under base_url, query params without crtfc_key and decode(response) -> (DART status, payload)
+        output: payload of the final response. Retryable failures are retried with backoff; DartError once retries run out
+        '''
+        url = f"{self.base_url}/{endpoint}"
+        key_pool = self.key_pool or default_pool()
+        attempt = 0
+        while True:
+            api_key = key_pool.acquire()
+            try:
+                response = self.session.get(url, params=dict(params, crtfc_key=api_key), timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status, message = "network", str(e)
+            else:
+                if response.status_code in RETRY_HTTP_CODES:
+                    status, message = f"http {response.status_code}", response.reason
+                else:
+                    status, payload = decode(response)
+                    if status not in RETRY_STATUSES: return payload
+                    message = RETRY_STATUSES[status]
+                    if status == STATUS_RATE_LIMITED:
+                        key_pool.report_rate_limited(api_key)
+                        if key_pool.available(): continue # another key still has quota, switch without waiting
+            if attempt >= self.max_retries: raise DartError(status, message)
+            print(f"DART {endpoint} {status} ({message}), retry {attempt + 1}/{self.max_retries}")
+            self.backoff(attempt)
+            attempt += 1
+
+    def get_json(self, endpoint: str, params: dict) -> dict:
+        '''
+        input: JSON endpoint such as 'list.json' and its query params
+        output: decoded response. Non-retryable statuses (e.g. 013 no data) are returned for the caller to handle
+        '''
+        def decode(response):
+            try: data = response.json()
+            except ValueError: return "900", None
+            return data.get("status"), data
+        return self.request(endpoint, params, decode)
+
+    def get_document(self, rcept_no: str) -> bytes:
+        '''
+        input: rcept_no
+        output: document.xml body; a zip archive, or DART's error body for non-retryable errors
+        '''
+        params = {"rcept_no": rcept_no}
+        return self.request("document.xml", params, lambda response: (document_status(response.content), response.content))
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def default_client() -> DartClient:
+    '''Client shared by every module so all calls reuse one connection pool'''
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = DartClient()
+    return _default_client
@@ -0,0 +1,117 @@
+from basics import split
+
+'''
+### Purpose ###
+    보고서 한 건의 표들을 감싸는 문서 객체
+    표마다 텍스트와 행/셀만 담은 작은 객체(Table)로 바꿔 두고 BeautifulSoup 트리는 바로 버리며, 키워드 -> 표 번호 색인을 만들어
+    extract_table_data 와 list_fund_participants 가 같은 결과를 공유한다
+'''
+
+class Table:
+    '''
+    Compact copy of one <table>: its text, every <tr> as ' | '-split parts, and the cell texts per section and cell tag.
+    Built once from the tag so the soup tree can be freed right after parsing; only what the extractors read is kept
+    '''
+    __slots__ = ('text', 'rows', '_cells')
+    SECTIONS = ('thead', 'tbody')
+    CELL_NAMES = ('th', 'td', 'te')
+
+    def __init__(self, text: str, rows: list, cells: dict):
+        self.text = text
+        self.rows = rows
+        self._cells = cells
+
+    @classmethod
+    def from_tag(cls, tag) -> 'Table':
+        '''
+        input: bs4 <table> tag
+        output: Table holding tag.get_text(), split(tr.get_text(' | ', strip=True)) per <tr>, and for the first <thead>
+                and <tbody> the get_text(strip=True) of its th / td / te cells per <tr>
+        Walks .descendants rather than find()/find_all(), which are several times slower for this
+        '''
+        trs, sections = [], {}
+        for node in tag.descendants: # strings have name None
+            if node.name == 'tr': trs.append(node)
+            elif node.name in cls.SECTIONS and node.name not in sections: sections[node.name] = node
+
+        cells = {}
+        for section in cls.SECTIONS:
+            section_rows = {cell_name: [] for cell_name in cls.CELL_NAMES}
+            section_tag = sections.get(section)
+            if section_tag is not None:
+                for tr in section_tag.descendants:
+                    if tr.name != 'tr': continue
+                    found = [node for node in tr.descendants if node.name in cls.CELL_NAMES]
+                    for cell_name in cls.CELL_NAMES:
+                        texts = [cell.get_text(strip=True) for cell in found if cell.name == cell_name]
+                        if texts: section_rows[cell_name].append(texts)
+            for cell_name, rows in section_rows.items(): cells[(section, cell_name)] = rows
+        rows = [split(tr.get_text(' | ', strip=True)) for tr in trs]
+        return cls(tag.get_text(), rows, cells)
+
+    def cells(self, section: str, cell_name: str) -> list:
+        '''
+        input: section tag ('thead' / 'tbody') and cell tag ('th' / 'td' / 'te')
+        output: text of those cells per <tr> of the section, rows without such cells left out
+        '''
+        return self._cells[(section, cell_name)]
+
+    def get_text(self) -> str:
+        return self.text
+
+class Document:
+    '''
+    Tables of one report, pulled lazily from a list or an iter_tables stream and kept as Table objects.
+    Iterating stops pulling as soon as the consumer stops; indexes() reads every table once per keyword.
+    '''
+    def __init__(self, tables):
+        self._source = iter(tables)
+        self.tables = []
+        self._keyword_index = {}
+
+    def _pull(self) -> bool:
+        for tag in self._source:
+            self.tables.append(tag if isinstance(tag, Table) else Table.from_tag(tag))
+            return True
+        return False
+
+    def _pull_all(self):
+        while self._pull(): pass
+
+    def __iter__(self):
+        idx = 0
+        while idx < len(self.tables) or self._pull():
+            yield self.tables[idx]
+            idx += 1
+
+    def __len__(self) -> int:
+        self._pull_all()
+        return len(self.tables)
+
+    def __getitem__(self, idx):
+        self._pull_all()
+        return self.tables[idx]
+
+    def find(self, *keywords, exclude: tuple = ()):
+        '''
+        input: keywords that must all appear and keywords that must not
+        output: (index, table) of the first matching table, or (-1, None)
+        '''
+        for idx, table in enumerate(self):
+            text = table.text
+            if all(keyword in text for keyword in keywords) and not any(keyword in text for keyword in exclude):
+                return idx, table
+        return -1, None
+
+    def indexes(self, keyword: str) -> list:
+        '''
+        input: keyword
+        output: indexes of every table whose text contains it, in document order
+        '''
+        if keyword not in self._keyword_index:
+            self._pull_all()
+            self._keyword_index[keyword] = [idx for idx, table in enumerate(self.tables) if keyword in table.text]
+        return self._keyword_index[keyword]
+
+def as_document(tables) -> Document:
+    return tables if isinstance(tables, Document) else Document(tables)
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+'''
+### Purpose ###
+    로컬에서 돌리는 OPENDART 대역 서버 (list.json, document.xml)
+    list.json 은 responses.zip 의 공시 목록을 기간으로 걸러 페이지 단위로, document.xml 은 보관된 원문 zip 폴더에서 돌려준다
+    응답 지연, 요청 제한(020) / 시스템 점검(800) 응답, HTTP 503, 깨진 zip 을 설정한 비율로 섞어
+    재시도, 이어받기, 장부(job_ledger) 동작을 네트워크 없이 반복해서 시험할 수 있다
+    usage: python fake_dart.py --port 8765 --latency 0.05 --rate-limit 0.05 --corrupt 0.02
+           DART_BASE_URL=http://127.0.0.1:8765/api python get_full_reports.py
+'''
+
+HOST = "127.0.0.1"
+PORT = 8765
+RESPONSES_ARCHIVE = "responses.zip"
+DOCUMENTS_DIR = "dart_documents"    # <rcept_no>.zip files, e.g. the archive_cache directory
+
+ERROR_MESSAGES = {
+    "013": "조회된 데이타가 없습니다.",
+    "014": "파일이 존재하지 않습니다.",
+    "020": "요청 제한을 초과하였습니다.",
+    "100": "필드의 부적절한 값입니다.",
+    "800": "시스템 점검으로 인한 서비스가 중지 중입니다.",
+}
+
+class FaultConfig:
+    '''
+    What the server injects. Rates are probabilities per request; latency is seconds plus up to `jitter` more.
+    rate_limit_every answers every N-th request with 020 regardless of the rate
+    '''
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0, rate_limit_every: int = 0,
+                 maintenance: float = 0.0, http_error: float = 0.0, corrupt: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_limit_every = rate_limit_every
+        self.maintenance = maintenance
+        self.http_error = http_error
+        self.corrupt = corrupt
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0: return False
+        with self._lock: return self._random.random() < rate
+
+    def delay(self):
+        if not (self.latency or self.jitter): return
+        with self._lock: extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        time.sleep(self.latency + extra)
+
+    def next_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+class ReportList:
+    '''list.json entries of every response file in responses.zip, loaded on first use'''
+    def __init__(self, archive: str = RESPONSES_ARCHIVE):
+        self.archive = archive
+        self._reports = None
+        self._lock = threading.Lock()
+
+    def reports(self) -> list:
+        with self._lock:
+            if self._reports is None:
+                reports = {}
+                with zipfile.ZipFile(self.archive) as zf:
+                    for name in sorted(zf.namelist()):
+                        if not name.endswith('.json'): continue
+                        for report in json.loads(zf.read(name)).get('list', []):
+                            reports[report.get('rcept_no')] = report # quarters overlap when re-collected
+                self._reports = sorted(reports.values(), key=lambda report: report.get('rcept_no', ''), reverse=True)
+        return self._reports
+
+    def page(self, params: dict) -> dict:
+        '''
+        input: list.json query params (bgn_de, end_de, corp_code, page_no, page_count)
+        output: list.json body for that page
+        '''
+        bgn_de, end_de = params.get('bgn_de', '00000000'), params.get('end_de', '99999999')
+        corp_code = params.get('corp_code')
+        try:
+            page_no = max(1, int(params.get('page_no', 1)))
+            page_count = min(100, max(1, int(params.get('page_count', 10))))
+        except ValueError:
+            return error_body("100")
+        matches = [report for report in self.reports()
+                   if bgn_de <= report.get('rcept_dt', '') <= end_de and (not corp_code or report.get('corp_code') == corp_code)]
+        if not matches: return error_body("013")
+        total_page = (len(matches) + page_count - 1) // page_count
+        start = (page_no - 1) * page_count
+        return {
+            "status": "000", "message": "정상",
+            "page_no": page_no, "page_count": page_count, "total_count": len(matches), "total_page": total_page,
+            "list": matches[start:start + page_count],
+        }
+
+def error_body(status: str) -> dict:
+    return {"status": status, "message": ERROR_MESSAGES.get(status, "정의되지 않은 오류가 발생하였습니다.")}
+
+def error_xml(status: str) -> bytes:
+    body = error_body(status)
+    return (f'<?xml version="1.0" encoding="UTF-8"?><result><status>{body["status"]}</status>'
+            f'<message>{body["message"]}</message></result>').encode('utf-8')
+
+def make_handler(reports: ReportList, documents_dir: str, faults: FaultConfig):
+    class DartHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass # keep the console for the pipeline's own output
+
+        def send(self, code: int, body: bytes, content_type: str):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            endpoint = url.path.rsplit('/', 1)[-1]
+            number = faults.next_request()
+            faults.delay()
+
+            if faults.roll(faults.http_error): return self.send(503, b"Service Unavailable", "text/plain")
+            status = None
+            if (faults.rate_limit_every and number % faults.rate_limit_every == 0) or faults.roll(faults.rate_limit): status = "020"
+            elif faults.roll(faults.maintenance): status = "800"
+
+            if endpoint == "list.json":
+                body = error_body(status) if status else reports.page(params)
+                return self.send(200, json.dumps(body, ensure_ascii=False).encode('utf-8'), "application/json;charset=UTF-8")
+            if endpoint == "document.xml":
+                if status: return self.send(200, error_xml(status), "application/xml;charset=UTF-8")
+                path = os.path.join(documents_dir, f"{os.path.basename(params.get('rcept_no', ''))}.zip")
+                if not os.path.isfile(path): return self.send(200, error_xml("014"), "application/xml;charset=UTF-8")
+                with open(path, 'rb') as f: content = f.read()
+                if faults.roll(faults.corrupt): content = content[:max(4, len(content) // 2)] # still starts with PK
+                return self.send(200, content, "application/x-msdownload")
+            self.send(404, b"Not Found", "text/plain")
+    return DartHandler
+
+def serve(host: str = HOST, port: int = PORT, responses: str = RESPONSES_ARCHIVE, documents_dir: str = DOCUMENTS_DIR,
+          faults: FaultConfig = None) -> ThreadingHTTPServer:
+    '''
+    input: bind address, data sources and faults to inject (port 0 picks a free port)
+    output: running server (in a daemon thread); its base URL is f"http://{host}:{server.server_port}/api".
+            Call shutdown() to stop it
+    '''
+    server = ThreadingHTTPServer((host, port), make_handler(ReportList(responses), documents_dir, faults or FaultConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Local OPENDART stand-in for offline runs")
+    arg_parser.add_argument("--host", default=HOST)
+    arg_parser.add_argument("--port", type=int, default=PORT)
+    arg_parser.add_argument("--responses", default=RESPONSES_ARCHIVE, help="zip of list.json response files")
+    arg_parser.add_argument("--documents", default=DOCUMENTS_DIR, help="directory of <rcept_no>.zip archives")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra random seconds")
+    arg_parser.add_argument("--rate-limit", type=float, default=0.0, help="share of requests answered with 020")
+    arg_parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every N-th request with 020")
+    arg_parser.add_argument("--maintenance", type=float, default=0.0, help="share of requests answered with 800")
+    arg_parser.add_argument("--http-error", type=float, default=0.0, help="share of requests answered with HTTP 503")
+    arg_parser.add_argument("--corrupt", type=float, default=0.0, help="share of documents returned truncated")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    faults = FaultConfig(args.latency, args.jitter, args.rate_limit, args.rate_limit_every, args.maintenance,
+                         args.http_error, args.corrupt, args.seed)
+    server = serve(args.host, args.port, args.responses, args.documents, faults)
+    print(f"Serving OPENDART stand-in; export DART_BASE_URL=http://{args.host}:{server.server_port}/api")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,73 +1,171 @@
 import json
 import os
+import re
+import zipfile
+from fnmatch import fnmatch
 from pathlib import Path
 
 RESPONSES_FOLDER = "responses"
+RESPONSES_ARCHIVE = "responses.zip"
+FILTER_RULES_FILE = "filter_rules.json" # optional; same keys as ReportFilter.from_dict, replaces the defaults below
+CORP_CLASSES = ["Y", "K"]
 EXCLUSION_KEYWORDS = ["[첨부정정]", "[첨부추가]"]
+SKIP_SUPERSEDED = True # group_by_corp_code keeps only the latest version of corrected filings (amendment_index)
 INCLUSION_KEYWORDS = [["전환사채", "교환사채", "신주인수권부사채"], "발행"]
 
+class ReportFilter:
+    """Keyword rules compiled once into a single regex over report_nm.
+
+    A name matches when it contains none of the exclusion keywords and at least one keyword of every inclusion
+    group; a group is a list of alternatives or a single keyword. The pattern is a chain of lookaheads, e.g.
+    (?s)^(?!.*(?:\\[첨부정정\\]|\\[첨부추가\\]))(?=.*(?:전환사채|교환사채|신주인수권부사채))(?=.*(?:발행))
+    Filings repeat a few hundred distinct titles, so each title's verdict is memoized after its first match.
+    """
+    def __init__(self, exclusion_keywords=EXCLUSION_KEYWORDS, inclusion_keywords=INCLUSION_KEYWORDS, corp_classes=CORP_CLASSES):
+        self.corp_classes = frozenset(corp_classes)
+        pattern = "(?s)^" # inline DOTALL so the pattern string alone is enough for pandas
+        if exclusion_keywords:
+            pattern += f"(?!.*(?:{'|'.join(map(re.escape, exclusion_keywords))}))"
+        for keyword_group in inclusion_keywords:
+            group = keyword_group if isinstance(keyword_group, list) else [keyword_group]
+            pattern += f"(?=.*(?:{'|'.join(map(re.escape, group))}))" if group else "(?!)" # an empty group never matches
+        self.pattern = re.compile(pattern)
+        self._verdicts = {}
+
+    def name_matches(self, report_nm):
+        verdict = self._verdicts.get(report_nm)
+        if verdict is None:
+            verdict = self._verdicts[report_nm] = self.pattern.match(report_nm) is not None
+        return verdict
+
+    @classmethod
+    def from_dict(cls, rules):
+        return cls(
+            rules.get("exclusion_keywords", EXCLUSION_KEYWORDS),
+            rules.get("inclusion_keywords", INCLUSION_KEYWORDS),
+            rules.get("corp_classes", CORP_CLASSES),
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f: return cls.from_dict(json.load(f))
+
+    def matches(self, report):
+        if report.get("corp_cls", "") not in self.corp_classes: return False
+        return self.name_matches(report.get("report_nm", ""))
+
+    def filter(self, reports):
+        """Return the reports that pass, in order."""
+        corp_classes, verdicts, name_matches = self.corp_classes, self._verdicts, self.name_matches
+        kept = []
+        for report in reports:
+            if report.get("corp_cls", "") not in corp_classes: continue
+            report_nm = report.get("report_nm", "")
+            verdict = verdicts.get(report_nm)
+            if verdict is None: verdict = name_matches(report_nm)
+            if verdict: kept.append(report)
+        return kept
+
+    def filter_frame(self, df):
+        """Vectorized filter for a pandas DataFrame with corp_cls and report_nm columns."""
+        mask = df["corp_cls"].isin(self.corp_classes) & df["report_nm"].str.match(self.pattern.pattern, na=False)
+        return df[mask]
+
+_default_filter = None
+
+def default_filter():
+    """Rules from FILTER_RULES_FILE when it exists, otherwise the keyword lists above. Loaded once."""
+    global _default_filter
+    if _default_filter is None:
+        _default_filter = ReportFilter.from_file(FILTER_RULES_FILE) if os.path.exists(FILTER_RULES_FILE) else ReportFilter()
+    return _default_filter
+
 def should_include_report(report):
-    corp_cls = report.get("corp_cls", "")
-    if corp_cls not in ["Y", "K"]: return False
-    
-    report_nm = report.get("report_nm", "")
-    for keyword in EXCLUSION_KEYWORDS:
-        if keyword in report_nm: return False
-
-    for keyword_group in INCLUSION_KEYWORDS:
-        group_matched = False
-        if isinstance(keyword_group, list):
-            for keyword in keyword_group:
-                if keyword in report_nm:
-                    group_matched = True
-                    break
-        else:
-            if keyword_group in report_nm:
-                group_matched = True
-        
-        if not group_matched:
-            return False
-    
-    return True
-
-def process_all_json_files():
-    responses_path = Path(RESPONSES_FOLDER)
-    json_files = sorted(responses_path.glob("response_*.json"))
-
-    all_filtered_reports = []
-    total_original = 0
-    total_filtered = 0
-    for json_file in json_files:
-        with open(json_file, "r", encoding="utf-8") as f: data = json.load(f)            
-        reports = data.get("list", [])
-        original_count = len(reports)
-        total_original += original_count
-        filtered_reports = [report for report in reports if should_include_report(report)]
-        filtered_count = len(filtered_reports)
-        total_filtered += filtered_count
-        all_filtered_reports.extend(filtered_reports)
-    
-    output_data = {
-        "total_original_count": total_original,
-        "total_filtered_count": total_filtered,
-        "list": all_filtered_reports
-    }
+    return (_default_filter or default_filter()).matches(report)
+
+def filter_reports(reports):
+    return default_filter().filter(reports)
+
+def iter_response_files(source):
+    """Yield (name, binary file) for every response_*.json in a folder or a zip archive, without extracting it."""
+    if os.path.isdir(source):
+        for json_file in sorted(Path(source).glob("response_*.json")):
+            with open(json_file, "rb") as f: yield json_file.name, f
+    else:
+        with zipfile.ZipFile(source) as zf:
+            names = sorted(name for name in zf.namelist() if fnmatch(os.path.basename(name), "response_*.json"))
+            for name in names:
+                with zf.open(name) as f: yield name, f
+
+def iter_reports(f):
+    """Yield the entries of a quarter file's "list". With ijson they are parsed one at a time."""
+    try:
+        import ijson # optional, and imported here so that loading this module stays fast
+    except ImportError:
+        ijson = None
+    if ijson is not None:
+        yield from ijson.items(f, "list.item", use_float=True)
+    else:
+        yield from json.load(f).get("list", [])
+
+def iter_filtered_reports(source=None, counts=None):
+    """Stream every report of every quarter file through should_include_report.
+
+    counts, if given, is updated with "total_original_count" and "total_filtered_count" as the stream advances.
+    """
+    if source is None:
+        source = RESPONSES_FOLDER if os.path.isdir(RESPONSES_FOLDER) else RESPONSES_ARCHIVE
+    if counts is None: counts = {}
+    counts.setdefault("total_original_count", 0)
+    counts.setdefault("total_filtered_count", 0)
+    for _, f in iter_response_files(source):
+        for report in iter_reports(f):
+            counts["total_original_count"] += 1
+            if should_include_report(report):
+                counts["total_filtered_count"] += 1
+                yield report
+
+def process_all_json_files(source=None):
+    counts = {}
+    unique_titles = set()
     output_filename = "filtered_B001_list.json"
+    # Written one report per line as the stream advances; the totals are only known at the end, so they follow the list
     with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        f.write('{\n  "list": [')
+        for idx, report in enumerate(iter_filtered_reports(source, counts)):
+            f.write(",\n    " if idx else "\n    ")
+            f.write(json.dumps(report, ensure_ascii=False))
+            title = report.get("report_nm")
+            if title:
+                unique_titles.add(title)
+        f.write("\n  ],\n")
+        f.write(f'  "total_original_count": {counts["total_original_count"]},\n')
+        f.write(f'  "total_filtered_count": {counts["total_filtered_count"]}\n}}\n')
     print(f"Processing completed! Results saved to: {output_filename}")
 
-    unique_titles = set()
-    for report in all_filtered_reports:
-        title = report.get("report_nm")
-        if title:
-            unique_titles.add(title)
     print("Unique report titles (in filtered set):")
     for t in sorted(unique_titles): print(" -", t)
 
-def group_by_corp_code():
+def group_by_corp_code(skip_superseded=SKIP_SUPERSEDED, source=None):
+    """Group filtered_B001_list.json by corp_code. With skip_superseded, filings a later correction replaced are left out
+    and each kept report lists the rcept_no it replaces under "supersedes". The links come from every filing in source
+    (the unfiltered quarter files), since attachment corrections explain part of the "정" flags; without it nothing is skipped."""
+    from amendment_index import load_index
+
     with open("filtered_B001_list.json", "r", encoding="utf-8") as f: data = json.load(f)
     reports = data.get("list", [])
+    index = None
+    if skip_superseded:
+        try:
+            index = load_index(source)
+        except FileNotFoundError as e:
+            print(f"Keeping every filing; no response files to link corrections from: {e}")
+    total_superseded = 0
+    if index is not None:
+        effective = index.effective(reports)
+        total_superseded = len(reports) - len(effective)
+        reports = effective
+        print(f"Skipping {total_superseded} superseded filings; {len(index.ambiguous)} flagged filings kept because their correction is ambiguous")
     
     grouped = {}
     for report in reports:
@@ -94,6 +192,7 @@ def group_by_corp_code():
                 "rcept_dt": report.get("rcept_dt"),
                 "rm": report.get("rm")
             }
+            if index is not None: cleaned_report["supersedes"] = index.versions(report.get("rcept_no"))
             cleaned_reports.append(cleaned_report)
         cleaned_reports.sort(key=lambda x: x.get("rcept_dt", ""), reverse=True)
         
@@ -105,6 +204,7 @@ def group_by_corp_code():
     output_data = {
         "total_companies": len(grouped_data),
         "total_reports": len(reports),
+        "total_superseded": total_superseded,
         "grouped_by_corp_code": grouped_data
     }
     
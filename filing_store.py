@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+
+from amendment_index import AmendmentIndex, bond_type, load_index, FILTERED_FILE
+
+'''
+### Purpose ###
+    주요사항보고서 공시 목록(list.json 항목)을 SQLite 에 색인해 두고 조회하는 저장소
+    회사(corp_code, stock_code), 접수일(rcept_dt), 사채 종류(CB/EB/BW) 색인이 있어 "최근 7일", "이 회사의 발행 이력" 같은
+    조회를 JSON 전체를 읽지 않고 바로 할 수 있다. 정정공시로 대체된 공시(amendment_index)는 기본적으로 빼고 돌려준다
+    정정 연결은 [첨부정정]/[첨부추가] 까지 보이는 필터 전 분기 파일(responses)로 만든다. 분기 파일이 없으면 연결 없이 모두 보여준다
+    usage: python filing_store.py load [filtered_B001_list.json] [responses]   (목록을 저장소에 넣기, 이미 있는 rcept_no 는 갱신)
+           python filing_store.py recent 7 [CB|EB|BW]             (최근 7일 공시)
+           python filing_store.py issuer <corp_code 또는 stock_code>  (회사별 공시 이력)
+'''
+
+STORE_FILE = "filings.sqlite3"
+BOND_TYPE_CODES = {"전환사채": "CB", "교환사채": "EB", "신주인수권부사채": "BW"}
+COLUMNS = ("rcept_no", "corp_code", "corp_name", "stock_code", "corp_cls", "report_nm", "bond_type", "rcept_dt", "rm", "superseded_by")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS filings (
+    rcept_no      TEXT PRIMARY KEY,
+    corp_code     TEXT,
+    corp_name     TEXT,
+    stock_code    TEXT,
+    corp_cls      TEXT,
+    report_nm     TEXT,
+    bond_type     TEXT,     -- CB / EB / BW, NULL for other filings
+    rcept_dt      TEXT,     -- YYYYMMDD
+    rm            TEXT,
+    superseded_by TEXT      -- rcept_no of the correction that replaced this filing
+);
+CREATE INDEX IF NOT EXISTS filings_issuer ON filings (corp_code, rcept_dt);
+CREATE INDEX IF NOT EXISTS filings_stock ON filings (stock_code, rcept_dt);
+CREATE INDEX IF NOT EXISTS filings_date ON filings (rcept_dt);
+CREATE INDEX IF NOT EXISTS filings_type_date ON filings (bond_type, rcept_dt);
+'''
+
+def bond_type_code(report_nm: str):
+    '''CB / EB / BW from the title, None when it is not a bond issue'''
+    return BOND_TYPE_CODES.get(bond_type(report_nm or ""))
+
+class FilingStore:
+    '''
+    filings table in a SQLite file; queries return dicts with the COLUMNS keys, newest filing first.
+    One connection shared under a lock, as in job_ledger.
+    '''
+    def __init__(self, path: str = STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+    def add(self, reports, index: AmendmentIndex = None) -> int:
+        '''
+        input: list.json entries and an amendment_index.load_index built from the unfiltered quarter files
+        output: number of filings written. rcept_no already stored are replaced. With index, superseded_by is set from it
+                for every stored filing of the issuers touched; without one, links are left empty (nothing is hidden)
+        '''
+        rows = [(report.get("rcept_no"), report.get("corp_code"), report.get("corp_name"), report.get("stock_code"),
+                 report.get("corp_cls"), report.get("report_nm"), bond_type_code(report.get("report_nm")),
+                 report.get("rcept_dt"), report.get("rm")) for report in reports]
+        corp_codes = sorted({row[1] for row in rows})
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO filings (rcept_no, corp_code, corp_name, stock_code, corp_cls, report_nm, bond_type, rcept_dt, rm)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if index is not None:
+                    for corp_code in corp_codes: self._relink(corp_code, index)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _relink(self, corp_code: str, index: AmendmentIndex):
+        stored = self._conn.execute("SELECT rcept_no FROM filings WHERE corp_code = ?", (corp_code,)).fetchall()
+        self._conn.executemany("UPDATE filings SET superseded_by = ? WHERE rcept_no = ?",
+                               ((index.superseded_by.get(rcept_no), rcept_no) for rcept_no, in stored))
+
+    def _query(self, where: list, params: list, bond_type: str = None, include_superseded: bool = False, limit: int = None) -> list:
+        if bond_type is not None:
+            where.append("bond_type = ?")
+            params.append(bond_type)
+        if not include_superseded: where.append("superseded_by IS NULL")
+        sql = f"SELECT {', '.join(COLUMNS)} FROM filings WHERE {' AND '.join(where) or '1'} ORDER BY rcept_dt DESC, rcept_no DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [dict(zip(COLUMNS, row)) for row in self._conn.execute(sql, params).fetchall()]
+
+    def between(self, bgn_de: str, end_de: str, bond_type: str = None, include_superseded: bool = False) -> list:
+        '''
+        input: first and last rcept_dt (YYYYMMDD, inclusive), optional CB / EB / BW
+        output: filings received in that range
+        '''
+        return self._query(["rcept_dt BETWEEN ? AND ?"], [bgn_de, end_de], bond_type, include_superseded)
+
+    def recent(self, days: int = 7, today: date = None, bond_type: str = None, include_superseded: bool = False) -> list:
+        '''
+        input: number of days, counting today (today defaults to the current date)
+        output: filings received in the last `days` days
+        '''
+        today = today or date.today()
+        return self.between((today - timedelta(days=days - 1)).strftime("%Y%m%d"), today.strftime("%Y%m%d"), bond_type, include_superseded)
+
+    def issuer(self, corp_code: str = None, stock_code: str = None, bond_type: str = None, include_superseded: bool = False,
+               limit: int = None) -> list:
+        '''
+        input: corp_code or stock_code of the issuer
+        output: the issuer's filings, newest first
+        '''
+        if corp_code is None and stock_code is None: raise ValueError("issuer needs corp_code or stock_code")
+        where, params = [], []
+        if corp_code is not None:
+            where.append("corp_code = ?")
+            params.append(corp_code)
+        if stock_code is not None:
+            where.append("stock_code = ?")
+            params.append(stock_code)
+        return self._query(where, params, bond_type, include_superseded, limit)
+
+    def counts(self) -> dict:
+        '''{bond type: (filings, of which superseded)}'''
+        with self._lock:
+            rows = self._conn.execute("SELECT COALESCE(bond_type, '-'), COUNT(*), COUNT(superseded_by) FROM filings GROUP BY 1 ORDER BY 1").fetchall()
+        return {code: (total, superseded) for code, total, superseded in rows}
+
+def print_filings(filings: list):
+    for filing in filings:
+        print(f"{filing['rcept_dt']}  {filing['rcept_no']}  {filing['bond_type'] or '-':2s}  {filing['corp_name']} ({filing['stock_code']})  {filing['report_nm']}")
+    print(f"{len(filings)} filings")
+
+if __name__ == "__main__":
+    store = FilingStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "counts"
+    if command == "load":
+        with open(sys.argv[2] if len(sys.argv) > 2 else FILTERED_FILE, "r", encoding="utf-8") as f: reports = json.load(f).get("list", [])
+        try:
+            index = load_index(sys.argv[3] if len(sys.argv) > 3 else None)
+        except FileNotFoundError as e:
+            index = None
+            print(f"Storing without amendment links; no response files: {e}")
+        print(f"Stored {store.add(reports, index)} filings in {STORE_FILE}: {store.counts()}")
+    elif command == "recent":
+        filings = store.recent(int(sys.argv[2]) if len(sys.argv) > 2 else 7, bond_type=sys.argv[3] if len(sys.argv) > 3 else None)
+        print_filings(filings)
+    elif command == "issuer":
+        code = sys.argv[2]
+        print_filings(store.issuer(corp_code=code) or store.issuer(stock_code=code))
+    else:
+        print(store.counts())
@@ -1,13 +1,16 @@
 import json
-import requests
-from config import API_KEY
+import os
+from datetime import date
+
+from dart_client import default_client, DartError
 
 '''
 ### Purpose ###
     OPENDART API를 이용해 "주요사항보고 > 주요사항보고서" 기존공시 및 정정공시 전부 수집하는 코드
+    완료된 분기와 페이지는 MANIFEST_FILE 에 기록되어, 재실행 시 완료 분기는 건너뛰고 실패한 분기는 마지막 페이지 다음부터 이어 받는다
 '''
 
-BASE_URL = "https://opendart.fss.or.kr/api/list.json"
+MANIFEST_FILE = "backfill_manifest.json"
 
 QUARTERS = [
     ("Q1", "0101", "0331"),  # 01/01 - 03/31
@@ -19,10 +22,38 @@ QUARTERS = [
 START_YEAR = 2020
 END_YEAR = 2025
 
-def collect_reports_for_period(year, quarter_name, bgn_de, end_de):
-    """Collect all reports for a specific period with pagination."""
-    params = {
-        "crtfc_key": API_KEY,       # OPENDART API Key
+def load_manifest():
+    """Read the backfill manifest: {filename: {"complete": bool, "total_page": int, "last_page": int}}."""
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f: return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def write_json(filename, data, indent=None):
+    """Write through a temp file so an interrupted run never leaves a truncated file behind."""
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_filename, filename)
+
+def is_open_period(end_de):
+    """A quarter that has not ended yet can still receive filings, so it is always re-fetched."""
+    return end_de >= date.today().strftime("%Y%m%d")
+
+def fetch_page(params, page_no):
+    """Fetch one list.json page; a request that still fails after the client's retries comes back as an error status."""
+    try:
+        return default_client().get_json("list.json", dict(params, page_no=page_no))
+    except DartError as e:
+        return {"status": e.status, "message": e.message}
+
+def collect_reports_for_period(year, quarter_name, bgn_de, end_de, manifest=None, filename=None):
+    """Collect all reports for a specific period with pagination.
+
+    With a manifest, every finished page is checkpointed to <filename>.partial so that a
+    failed run resumes from the last good page instead of page 1.
+    """
+    params = { # OPENDART API key (crtfc_key) is added per request by the client's key pool
         "bgn_de": bgn_de,           # 시작일
         "end_de": end_de,           # 종료일
         "last_reprt_at": "N",       # 기존공시 및 정정공시 전부 수집
@@ -30,28 +61,54 @@ def collect_reports_for_period(year, quarter_name, bgn_de, end_de):
         "pblntf_detail_ty": "B001", # 주요사항보고서
         "page_count": 100,          # 요청당 최대 개수인 100개 수집
     }
-    
-    # First request to get total page count
-    first_response = requests.get(BASE_URL, params=params)
-    first_data = first_response.json()
-    
-    if first_data.get("status") != "000":
-        print(f"Error for {year} {quarter_name}: {first_data.get('message', 'API error')}")
-        return None
-    
-    total_page = first_data.get("total_page", 1)
-    
-    # Collect all reports from all pages
+
+    checkpoint = manifest is not None and filename is not None
+    partial_filename = f"{filename}.partial"
+    entry = manifest.get(filename, {}) if checkpoint else {}
+
     all_reports = []
-    for page_no in range(1, total_page + 1):
-        params["page_no"] = page_no
-        response = requests.get(BASE_URL, params=params)
-        data = response.json()
-        
-        if data.get("status") == "000" and "list" in data:
-            all_reports.extend(data["list"])
-            print(f"  Page {page_no}/{total_page}: Collected {len(data['list'])} reports")
-    
+    last_page = 0
+    total_page = None
+    # list.json is newest first, so filings that arrive in an open quarter shift every page; its partial is stale
+    if entry.get("last_page") and not entry.get("complete") and os.path.exists(partial_filename) and is_open_period(end_de):
+        print(f"  Quarter is still open; restarting from page 1 instead of resuming")
+    elif entry.get("last_page") and not entry.get("complete") and os.path.exists(partial_filename):
+        with open(partial_filename, "r", encoding="utf-8") as f: all_reports = json.load(f)
+        last_page = entry["last_page"]
+        if entry.get("total_page") and last_page >= entry["total_page"]:
+            # the run stopped after the last page's checkpoint but before the final write; there is no next page to ask for
+            total_page = entry["total_page"]
+            print(f"  All {total_page} pages were checkpointed; finishing from {partial_filename}")
+        else:
+            print(f"  Resuming from page {last_page + 1}")
+
+    if total_page is None:
+        # The first requested page also carries the total page count, so it is not requested twice
+        first_data = fetch_page(params, last_page + 1)
+
+        if first_data.get("status") != "000":
+            print(f"Error for {year} {quarter_name}: {first_data.get('message', 'API error')}")
+            return None
+
+        total_page = first_data.get("total_page", 1)
+
+    # Collect all reports from all pages
+    for page_no in range(last_page + 1, total_page + 1):
+        data = first_data if page_no == last_page + 1 else fetch_page(params, page_no)
+
+        if data.get("status") != "000" or "list" not in data:
+            # Stop rather than skip the page; the next run resumes from here
+            print(f"  Page {page_no}/{total_page} failed: {data.get('message', 'API error')}")
+            return None
+
+        all_reports.extend(data["list"])
+        print(f"  Page {page_no}/{total_page}: Collected {len(data['list'])} reports")
+
+        if checkpoint:
+            write_json(partial_filename, all_reports)
+            manifest[filename] = {"complete": False, "total_page": total_page, "last_page": page_no}
+            write_json(MANIFEST_FILE, manifest, indent=2)
+
     # Combine all reports into final response structure
     final_data = {
         "status": "000",
@@ -64,32 +121,44 @@ def collect_reports_for_period(year, quarter_name, bgn_de, end_de):
         "total_page": total_page,
         "list": all_reports
     }
-    
+
     return final_data
 
-# Iterate through all years and quarters
-for year in range(START_YEAR, END_YEAR + 1):
+def main():
+    manifest = load_manifest()
+
+    # Iterate through all years and quarters
+    for year in range(START_YEAR, END_YEAR + 1):
+        print(f"\n{'='*60}")
+        print(f"Processing year {year}")
+        print(f"{'='*60}")
+
+        for quarter_name, start_date, end_date in QUARTERS:
+            bgn_de = f"{year}{start_date}"
+            end_de = f"{year}{end_date}"
+            filename = f"response_{year}_{quarter_name}.json"
+
+            if manifest.get(filename, {}).get("complete") and os.path.exists(filename) and not is_open_period(end_de):
+                print(f"\nSkipping {year} {quarter_name}: {filename} is complete")
+                continue
+
+            print(f"\nCollecting {year} {quarter_name} ({bgn_de} - {end_de})...")
+
+            data = collect_reports_for_period(year, quarter_name, bgn_de, end_de, manifest, filename)
+
+            if data:
+                write_json(filename, data, indent=2)
+                manifest[filename] = {"complete": not is_open_period(end_de), "total_page": data["total_page"], "last_page": data["total_page"]}
+                write_json(MANIFEST_FILE, manifest, indent=2)
+                if os.path.exists(f"{filename}.partial"): os.remove(f"{filename}.partial")
+
+                print(f"  ✓ Saved {len(data['list'])} reports to {filename}")
+            else:
+                print(f"  ✗ Failed to collect data for {year} {quarter_name}")
+
     print(f"\n{'='*60}")
-    print(f"Processing year {year}")
+    print("All data collection completed!")
     print(f"{'='*60}")
-    
-    for quarter_name, start_date, end_date in QUARTERS:
-        bgn_de = f"{year}{start_date}"
-        end_de = f"{year}{end_date}"
-        
-        print(f"\nCollecting {year} {quarter_name} ({bgn_de} - {end_de})...")
-        
-        data = collect_reports_for_period(year, quarter_name, bgn_de, end_de)
-        
-        if data:
-            filename = f"response_{year}_{quarter_name}.json"
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            print(f"  ✓ Saved {len(data['list'])} reports to {filename}")
-        else:
-            print(f"  ✗ Failed to collect data for {year} {quarter_name}")
 
-print(f"\n{'='*60}")
-print("All data collection completed!")
-print(f"{'='*60}")
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,222 @@
 import json
 import os
-import zipfile
-from io import BytesIO
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from itertools import islice, tee
 
-import requests
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+from bs4 import XMLParsedAsHTMLWarning
 import warnings
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
-from config import API_KEY
-from basics import parse_number, parse_date, split
-from sub import list_fund_participants
+from basics import parse_number, parse_date, iter_tables, RateLimiter, PARSER, PARSER_ENGINES
+from sub import participant_rows, resolve_participants
+from document import Document, as_document
+from archive_cache import default_cache, is_archive
+from dart_client import default_client, document_status
+from report_sink import JsonLinesWriter, REPORTS_FILE
+from job_ledger import JobLedger, LEDGER_FILE, DOWNLOADED, EXTRACTED, EMPTY, FAILED
+from result_cache import ResultCache, RESULTS_FILE, code_version
+from sharding import parse_shard, in_shard, shard_path, shard_keys
+import metrics
+from metrics import METRICS_JSON, METRICS_PROM
 from datetime import datetime
 
 GROUPED_FILE = "filtered_B001_list_grouped.json"
-DOCUMENT_URL = "https://opendart.fss.or.kr/api/document.xml"
 OUTPUT_DIR = "dart_documents"
-BATCH_SIZE = 50
+CONCURRENCY = 8             # document downloads kept in flight; 1 downloads sequentially
+REQUESTS_PER_SECOND = 5.0   # ceiling across all download threads, stays under DART throttling
+PARSE_WORKERS = 0           # >0 parses documents in that many worker processes while downloads continue
+SKIP_ATTACHMENTS = False    # True parses only the main <rcept_no>.xml member of each archive
+WORKER = "main"             # ledger claim owner; give each parallel worker its own id
 
-def unpack(rcept_no: str) -> list:
+def download(rcept_no: str, limiter: RateLimiter = None) -> bytes:
     '''
     input: rcept_no
-    output: list of tables in the report
+    output: raw document.xml zip bytes, served from the local archive cache when possible
     '''
-    source_download_url = "https://opendart.fss.or.kr/api/document.xml"
-    url = f"{source_download_url}?crtfc_key={API_KEY}&rcept_no={rcept_no}"
-    response = requests.get(url)
-    
-    all_tables = []
+    cache = default_cache()
+    with metrics.timer('cache_read'):
+        content = cache.get(rcept_no)
+    if content is not None:
+        metrics.count('cache_hits')
+        return content
+
+    if limiter is not None: limiter.wait() # only network calls count against the ceiling
+    with metrics.timer('download'):
+        content = default_client().get_document(rcept_no)
+    metrics.count('documents_downloaded')
+    metrics.count('bytes_downloaded', len(content))
+    cache.put(rcept_no, content)
+    return content
+
+def unpack(rcept_no: str) -> Document:
+    '''
+    input: rcept_no
+    output: Document holding the tables of the report
+    '''
+    return Document(iter_tables(download(rcept_no), verbose=False, compact=True))
+
+def fetch_document(rcept_no: str, limiter: RateLimiter = None, ledger: JobLedger = None, results: ResultCache = None,
+                   version: str = None) -> tuple:
+    '''
+    input: rcept_no, optional rate limiter, the job ledger to record the download in, and the result cache with the
+           current extractor_version
+    output: (zip bytes, None), (cached extract_document result, None) when results has this version's result,
+            or (None, error message) when the download fails or DART answers with an error body
+    '''
+    if results is not None:
+        with metrics.timer('result_cache_read'):
+            extracted = results.get(rcept_no, version)
+        if extracted is not None:
+            metrics.count('result_cache_hits')
+            return extracted, None
+
     try:
-        with zipfile.ZipFile(BytesIO(response.content)) as zf:
-            file_list = zf.namelist()
-            for name in file_list:
-                with zf.open(name) as f:
-                    data = f.read()
-                    try: text = data.decode('utf-8')
-                    except UnicodeDecodeError:
-                        # print(f"Error decoding with utf-8: {name}")
-                        try: text = data.decode('cp949')
-                        except UnicodeDecodeError: 
-                            # print(f"- Error decoding with cp949: {name}")
-                            print("Decoding Error")
-                            text = None
-
-                    if text is not None:
-                        soup = BeautifulSoup(text, 'html.parser')
-                        tables = soup.find_all('table')
-                        all_tables.extend(tables)
-    except zipfile.BadZipFile: pass
-    return all_tables
-
-def extract_table_data(report: dict, tables: list) -> dict:
-    target_table = None
-    for table in tables:
-        table_text = table.get_text()
-        if "사채의 종류" in table_text and "권면" in table_text and "정정" not in table_text:
-            target_table = table
-            break
+        content = download(rcept_no, limiter)
+    except Exception as e:
+        metrics.count('download_failures')
+        return None, f"download: {e}"
+    status = document_status(content)
+    if status is not None:
+        metrics.count('error_documents')
+        return None, f"document.xml status {status}"
+    if not is_archive(content):
+        metrics.count('corrupt_archives')
+        return None, "corrupt archive"
+    if ledger is not None: ledger.mark(rcept_no, DOWNLOADED)
+    return content, None
+
+def download_in_order(rcept_nos, max_workers: int = CONCURRENCY, requests_per_second: float = REQUESTS_PER_SECOND, fetch=download):
+    '''
+    input: iterable of rcept_no and fetch(rcept_no, limiter) run in the download threads
+    output: yields (rcept_no, fetch result) in input order while up to max_workers downloads are in flight
+    '''
+    limiter = RateLimiter(requests_per_second)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for rcept_no in rcept_nos:
+            pending.append((rcept_no, executor.submit(fetch, rcept_no, limiter)))
+            if len(pending) >= 2 * max_workers: # bounded read-ahead keeps memory flat
+                done_no, future = pending.popleft()
+                yield done_no, future.result()
+        while pending:
+            done_no, future = pending.popleft()
+            yield done_no, future.result()
+
+class FieldSpec:
+    '''
+    One row field of the bond-terms table.
+    A row belongs to it when its label contains every keyword in all_of and, if any_of is given, at least one of those.
+    The value is convert(parts[cell]), or convert(parts[1:]) with rest=True, and is only written when the row has that cell.
+    first_only keeps the first value and, once the field is set, skips the remaining specs for that row.
+    '''
+    __slots__ = ('field', 'all_of', 'any_of', 'cell', 'convert', 'rest', 'first_only')
+
+    def __init__(self, field: str, all_of: tuple = (), any_of: tuple = (), cell: int = 1, convert=None,
+                 rest: bool = False, first_only: bool = False):
+        self.field = field
+        self.all_of = all_of
+        self.any_of = any_of
+        self.cell = cell
+        self.convert = convert
+        self.rest = rest
+        self.first_only = first_only
+
+    def matches(self, label: str) -> bool:
+        return all(keyword in label for keyword in self.all_of) and (not self.any_of or any(keyword in label for keyword in self.any_of))
+
+    def apply(self, result: dict, parts: list) -> bool:
+        '''
+        input: result dict being filled and the row parts
+        output: True when the remaining specs must be skipped for this row
+        '''
+        if self.first_only and self.field in result: return True
+        if self.rest:
+            if len(parts) > 1: result[self.field] = self.convert(parts[1:]) if self.convert else parts[1:]
+        elif len(parts) > self.cell:
+            result[self.field] = self.convert(parts[self.cell]) if self.convert else parts[self.cell]
+        return False
+
+class FieldDispatcher:
+    '''
+    Routes each row to the specs whose keywords its label contains, in spec order.
+    Labels repeat across reports, so each label is classified once and its route memoized.
+    '''
+    def __init__(self, specs: list, memo_size: int = 4096):
+        self.specs = list(specs)
+        self.memo_size = memo_size
+        self._routes = {}
+
+    def route(self, label: str) -> tuple:
+        specs = self._routes.get(label)
+        if specs is None:
+            if len(self._routes) >= self.memo_size: self._routes.clear()
+            specs = self._routes[label] = tuple(spec for spec in self.specs if spec.matches(label))
+        return specs
+
+    def apply(self, result: dict, parts: list):
+        for spec in self.route(parts[0]):
+            if spec.apply(result, parts): break
+
+def format_rate(text: str) -> str:
+    '''
+    input: rate cell such as '2.50%'
+    output: '2.5%', or the cell unchanged when it is not a number
+    '''
+    try: rate = float(text.strip('%')) / 100
+    except ValueError: return text
+    return f"{round(100*rate, 1)}%"
+
+def refixing_price(text: str):
+    price = parse_number(text)
+    return "-" if price == -1.0 else price
+
+def maturity_years(payment_date, maturity_date) -> str:
+    '''
+    input: 납입일 and 만기일 as parse_date results (or None)
+    output: term such as '3.0년', "-" when either date is missing
+    '''
+    if payment_date in (None, "-") or maturity_date in (None, "-"): return "-"
+    diff_days = (datetime.strptime(maturity_date, "%Y-%m-%d") - datetime.strptime(payment_date, "%Y-%m-%d")).days
+    return f"{round(diff_days/365.0, 1)}년"
+
+def refixing_ratio(refixing, conversion_price) -> str:
+    '''
+    input: 리픽싱가격 (number or "-") and 전환가액(원)
+    output: refixing floor as a percentage of the conversion price, "-" when it cannot be computed
+    '''
+    if not isinstance(refixing, float) or not isinstance(conversion_price, float) or conversion_price == 0: return "-"
+    return f"{round(100 * refixing / conversion_price, 0)}%"
+
+# Row label keywords -> result field, checked in this order for every row of the bond-terms table.
+# New bond terms (e.g. 조기상환) are added here without touching extract_table_data.
+FIELD_SPECS = [
+    FieldSpec('납입일', ('납입일',), convert=parse_date),
+    FieldSpec('회차', ('사채의 종류',), cell=2),
+    FieldSpec('발행금액(억)', ('사채의 권면',), convert=lambda text: parse_number(text)/10**8),
+    FieldSpec('전환가액(원)', ('전환가액', '원'), convert=parse_number, first_only=True),
+    FieldSpec('전환가액(원)', ('교환가액', '원'), convert=parse_number, first_only=True),
+    FieldSpec('전환가액(원)', ('행사가액', '원'), convert=parse_number, first_only=True),
+    FieldSpec('전환가액 결정방법', any_of=('전환가액 결정방법', '교환가액 결정방법', '행사가액 결정방법'), rest=True),
+    FieldSpec('표면이율', ('사채의 이율',), cell=2, convert=format_rate),
+    FieldSpec('만기이율', ('만기이자율',), convert=format_rate),
+    FieldSpec('만기일', ('사채만기일',), convert=parse_date),
+    FieldSpec('리픽싱가격', ('시가하락',), cell=2, convert=refixing_price),
+    FieldSpec('리픽싱내용', ('조정가액 근거',), rest=True, convert=' '.join),
+    FieldSpec('대상주식', any_of=('교환대상', '전환에 따라'), cell=2),
+    FieldSpec('옵션사항', ('옵션에 관한',), rest=True, convert=' '.join),
+]
+FIELD_DISPATCHER = FieldDispatcher(FIELD_SPECS)
+
+def extract_fields(report: dict, document: Document) -> dict:
+    '''
+    input: report metadata and its Document
+    output: bond-term fields of table_data (everything but 발행대상/검산), {} when the bond-terms table is not found
+    '''
+    _, target_table = document.find("사채의 종류", "권면", exclude=("정정",))
     if target_table is None: return {}
 
     result_dict = {}
@@ -68,166 +228,236 @@ def extract_table_data(report: dict, tables: list) -> dict:
     else: report_type = "N/A"
     result_dict['종류'] = report_type
 
-    for _, tr in enumerate(target_table.find_all('tr')):
-        row_text = tr.get_text(' | ', strip=True)
-        row_parts = split(row_text)
+    for row_parts in target_table.rows:
         if len(row_parts) == 0: continue
-        keyword_text = row_parts[0]
-
-        if '납입일' in keyword_text:
-            if len(row_parts) > 1:
-                result_dict['납입일'] = parse_date(row_parts[1])
-
-        if '사채의 종류' in keyword_text: 
-            if len(row_parts) > 2:
-                result_dict['회차'] = row_parts[2]
-        
-        if '사채의 권면' in keyword_text:
-            if len(row_parts) > 1:
-                result_dict['발행금액(억)'] = parse_number(row_parts[1])/10**8
-
-        if '전환가액' in keyword_text and '원' in keyword_text:
-            if '전환가액(원)' in result_dict.keys(): continue
-            if len(row_parts) > 1:
-                result_dict['전환가액(원)'] = parse_number(row_parts[1])
-        if '교환가액' in keyword_text and '원' in keyword_text: 
-            if '전환가액(원)' in result_dict.keys(): continue
-            if len(row_parts) > 1:
-                result_dict['전환가액(원)'] = parse_number(row_parts[1])
-        if '행사가액' in keyword_text and '원' in keyword_text: 
-            if '전환가액(원)' in result_dict.keys(): continue
-            if len(row_parts) > 1:
-                result_dict['전환가액(원)'] = parse_number(row_parts[1])
-
-        if '전환가액 결정방법' in keyword_text: 
-            if len(row_parts) > 1: result_dict['전환가액 결정방법'] = row_parts[1:]
-        elif '교환가액 결정방법' in keyword_text: 
-            if len(row_parts) > 1: result_dict['전환가액 결정방법'] = row_parts[1:]
-        elif '행사가액 결정방법' in keyword_text: 
-            if len(row_parts) > 1: result_dict['전환가액 결정방법'] = row_parts[1:]
-        
-        if '사채의 이율' in keyword_text:
-            if len(row_parts) > 2:
-                result_dict['표면이율'] = row_parts[2]
-                try:
-                    rate = float(row_parts[2].strip('%')) / 100
-                    result_dict['표면이율'] = f"{round(100*rate, 1)}%"
-                except:
-                    None
-
-        if '만기이자율' in keyword_text: 
-            if len(row_parts) > 1:
-                result_dict['만기이율'] = row_parts[1]
-                try:
-                    rate = float(row_parts[1].strip('%')) / 100
-                    result_dict['만기이율'] = f"{round(100*rate, 1)}%"
-                except:
-                    None
-
-        if '사채만기일' in keyword_text:
-            if len(row_parts) > 1:
-                result_dict['만기일'] = parse_date(row_parts[1])
-
-        if '시가하락' in keyword_text:
-            if len(row_parts) > 2:
-                result_dict['리픽싱가격'] = parse_number(row_parts[2])
-                if result_dict['리픽싱가격'] == -1.0: result_dict['리픽싱가격'] = "-"
-
-        if '조정가액 근거' in keyword_text: 
-            if len(row_parts) > 1:
-                result_dict['리픽싱내용'] = ' '.join(row_parts[1:])
-                if result_dict['리픽싱내용'] == ['-']: result_dict['리픽싱내용'] = "-"
-
-        if '교환대상' in keyword_text:
-            if len(row_parts) > 2:
-                result_dict['대상주식'] = row_parts[2]
-
-        elif '전환에 따라' in keyword_text:
-            if len(row_parts) > 2:
-                result_dict['대상주식'] = row_parts[2]
-
-        if '옵션에 관한' in keyword_text:
-            if len(row_parts) > 1:
-                result_dict['옵션사항'] = ' '.join(row_parts[1:])
+        FIELD_DISPATCHER.apply(result_dict, row_parts)
 
-    try:
-        date_format = "%Y-%m-%d"
-        date1 = datetime.strptime(result_dict['만기일'], date_format)
-        date2 = datetime.strptime(result_dict['납입일'], date_format)
-        diff_days = (date1 - date2).days
-        result_dict['만기'] = f"{round(diff_days/365.0, 1)}년"
-    except:
-        result_dict['만기'] = "-"
+    result_dict['만기'] = maturity_years(result_dict.get('납입일'), result_dict.get('만기일'))
 
     if '리픽싱가격' not in result_dict.keys(): result_dict['리픽싱가격'] = "-"
     if '리픽싱내용' not in result_dict.keys(): result_dict['리픽싱내용'] = "-"
+    result_dict['리픽싱가격'] = refixing_ratio(result_dict['리픽싱가격'], result_dict.get('전환가액(원)'))
+    return result_dict
+
+def extract_document(report: dict, tables) -> dict:
+    '''
+    input: report metadata and its tables as a Document, a list or a lazy iter_tables stream
+    output: {"fields": extract_fields result, "participants": sub.participant_rows result (None when it failed)}.
+            Everything read from the document and nothing that depends on CORPNAMES, so result_cache can store it as JSON
+    '''
+    document = as_document(tables) # table text and rows are computed once and shared with participant_rows
+    fields = extract_fields(report, document)
+    if not fields: return {"fields": fields, "participants": None}
     try:
-        result_dict['리픽싱가격'] = f"{round(100 * result_dict['리픽싱가격'] / result_dict['전환가액(원)'],0)}%"
-    except:
-        result_dict['리픽싱가격'] = "-"
-    
+        with metrics.timer('participants'):
+            participants = participant_rows(document)
+    except Exception:
+        participants = None
+    return {"fields": fields, "participants": participants}
+
+def finish_extraction(extracted: dict) -> dict:
+    '''
+    input: extract_document result, freshly parsed or read from result_cache
+    output: table_data dict with 발행대상/검산 resolved by the current CORPNAMES
+    '''
+    if not extracted["fields"]: return {}
+    result_dict = dict(extracted["fields"])
     try:
-        result_dict['발행대상'], result_dict['검산'] = list_fund_participants(tables)
+        with metrics.timer('names'):
+            result_dict['발행대상'], result_dict['검산'] = resolve_participants(extracted["participants"])
     except Exception:
         result_dict['발행대상'], result_dict['검산'] = "-", 0.0
-
     return result_dict
 
-SAMPLE_COMPANY_COUNT = 9999  # high cap; actual batching controls memory
-
-def main():
-    with open(GROUPED_FILE, "r", encoding="utf-8") as f: grouped_data = json.load(f)
-    grouped_data = grouped_data.get("grouped_by_corp_code")
-
-    def save_batch(batch_results, batch_index):
-        out_file = f"reports_details_part_{batch_index}.json"
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(batch_results, f, ensure_ascii=False, indent=2)
-        print(f"Saved {len(batch_results)} reports to {out_file}")
+def extract_table_data(report: dict, tables) -> dict:
+    '''
+    input: report metadata and its tables as a Document, a list or a lazy iter_tables stream
+    output: table_data dict
+    '''
+    return finish_extraction(extract_document(report, tables))
 
-    batch_results = []
-    batch_index = 1
-    company_counter = 0
+def parse_report(report: dict, content: bytes, parser: str = PARSER) -> dict:
+    '''
+    input: report metadata, its raw document.xml zip bytes and a basics.PARSER_ENGINES name
+    output: extract_document result. Module level so it can run in a worker process
+    '''
+    document = Document(iter_tables(content, verbose=False, parser=parser, skip_attachments=SKIP_ATTACHMENTS, compact=True))
+    len(document) # extraction reads every table anyway; pulling them first keeps inflate/decode/parse out of the extract timer
+    with metrics.timer('extract'):
+        return extract_document(report, document)
 
-    for _, corp_data in grouped_data.items():
-        if company_counter >= SAMPLE_COMPANY_COUNT: break
+def extract_report(report: dict, content: bytes, parser: str = PARSER) -> dict:
+    '''
+    input: report metadata, its raw document.xml zip bytes and a basics.PARSER_ENGINES name
+    output: table_data dict
+    '''
+    return finish_extraction(parse_report(report, content, parser))
 
-        if company_counter % 10 == 0:
-            print(f"Processing company {company_counter}")
+def extractor_version(parser: str = PARSER) -> str:
+    '''
+    input: basics.PARSER_ENGINES name
+    output: result_cache version of parse_report: a hash of the parsing, table model, field spec and participant row code
+            and the parser settings. CORPNAMES is not part of it; names are resolved again every time a result is read
+    '''
+    import basics, document, sub, bs4
+    return code_version(
+        basics.PARSER_ENGINES[parser], SKIP_ATTACHMENTS, bs4.__version__,
+        basics.split, basics.parse_number, basics.parse_date, basics.parse_tables, basics.iter_tables, basics.is_attachment,
+        document.Table, document.Document, document.as_document,
+        FieldSpec, FieldDispatcher, FIELD_SPECS, format_rate, refixing_price, maturity_years, refixing_ratio,
+        extract_fields, extract_document, parse_report, sub.participant_rows, sub.extract_bonken_numbers, sub.pad_row,
+    )
+
+def extract_job(report: dict, fetched: tuple, parser: str = PARSER) -> tuple:
+    '''
+    input: report metadata, fetch_document's (zip bytes or cached extract_document result, error) and a basics.PARSER_ENGINES name
+    output: (ledger state, table_data or error message, metrics snapshot of this job, extract_document result to cache
+            or None). Errors are returned rather than raised so one bad report does not stop the run; the snapshot
+            carries a worker process's timings back to main
+    '''
+    content, error = fetched
+    with metrics.recording(metrics.Metrics()) as job_metrics:
+        if error is not None: return FAILED, error, job_metrics.snapshot(), None
+        try:
+            if isinstance(content, dict): extracted, parsed = content, None # result_cache hit, nothing to parse
+            else: extracted = parsed = parse_report(report, content, parser)
+            table_data = finish_extraction(extracted)
+        except Exception as e:
+            return FAILED, f"extract: {e!r}", job_metrics.snapshot(), None
+    return (EXTRACTED if table_data else EMPTY), table_data, job_metrics.snapshot(), parsed
+
+def extract_in_order(reports, documents, parse_workers: int = PARSE_WORKERS, parser: str = PARSER, extract=extract_report):
+    '''
+    input: reports, their (rcept_no, content) pairs in the same order and a module-level extract(report, content, parser)
+    output: yields extract's result per report in that order; decode, parse and extraction run in a process pool
+    '''
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        pending = deque()
+        for report, (_, content) in zip(reports, documents):
+            pending.append(executor.submit(extract, report, content, parser))
+            if len(pending) >= 2 * parse_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+SAMPLE_COMPANY_COUNT = 9999  # high cap; results are streamed to REPORTS_FILE, so memory does not grow with it
+
+def main(concurrency: int = CONCURRENCY, requests_per_second: float = REQUESTS_PER_SECOND, parse_workers: int = PARSE_WORKERS,
+         parser: str = PARSER, retry_failed: bool = False, worker: str = WORKER, ledger_path: str = LEDGER_FILE,
+         output: str = REPORTS_FILE, results_path: str = RESULTS_FILE, shard: tuple = None):
+    '''
+    Processes every report of GROUPED_FILE that the ledger has not finished and appends the results to output.
+    A fresh ledger starts a fresh output; otherwise the run resumes where the ledger left off.
+    retry_failed processes only the reports that failed before. Parallel workers need distinct worker ids and outputs.
+    Reports parsed by the same extractor code before are served from results_path without download or parse (None disables it).
+    shard (i, N) processes only the companies sharding.shard_of puts in shard i, with its own output, ledger, metrics
+    and share of the API keys; sharding.merge_shards combines the shard outputs afterwards
+    '''
+    metrics_json, metrics_prom = METRICS_JSON, METRICS_PROM
+    if shard is not None:
+        output, ledger_path = shard_path(output, shard), shard_path(ledger_path, shard)
+        metrics_json, metrics_prom = shard_path(metrics_json, shard), shard_path(metrics_prom, shard)
+        from credentials import load_keys, use_keys
+        keys = shard_keys(load_keys(), shard)
+        use_keys(keys)
+        print(f"Shard {shard[0]}/{shard[1]}: {len(keys)} API keys, output {output}")
 
-        corp_name = corp_data.get("corp_name") 
-        stock_code = "A" + corp_data.get("stock_code")
+    with open(GROUPED_FILE, "r", encoding="utf-8") as f: grouped_data = json.load(f)
+    grouped_data = grouped_data.get("grouped_by_corp_code")
+    companies = list(islice(grouped_data.items(), SAMPLE_COMPANY_COUNT))
 
+    jobs = {} # rcept_no -> (company index, company fields of the record, report)
+    for company_index, (corp_code, corp_data) in enumerate(companies): # indexes count every company, so shards report the same numbers
+        if not in_shard(corp_code, shard): continue
         corp_cls = corp_data.get("corp_cls")
         if corp_cls == "Y": corp_cls = "코스피"
         elif corp_cls == "K": corp_cls = "코스닥"
         else: corp_cls = "오류"
-
-        reports = corp_data.get("reports")
-        for report in reports:
+        company = {"corp_name": corp_data.get("corp_name"), "stock_code": "A" + corp_data.get("stock_code"), "corp_cls": corp_cls}
+        for report in corp_data.get("reports"):
+            jobs.setdefault(report.get("rcept_no"), (company_index, company, report))
+
+    run_start = time.time()
+    run_metrics = metrics.reset_default() # download threads record into the default, so each run starts from zero
+    ledger = JobLedger(ledger_path)
+    resuming = ledger.started()
+    ledger.add(jobs)
+    ledger.release(worker) # claims this worker id still holds are from a run that died
+    if resuming: print(f"Resuming from ledger {ledger_path}: {ledger.counts()}")
+
+    # Downloads run ahead in a thread pool and parsing in a process pool,
+    # but results are handed back in the order the ledger hands out work (the per-company order)
+    # work is claimed lazily, batch by batch, so parallel workers share the ledger instead of one taking everything
+    claimed = (jobs[rcept_no][2] for rcept_no in ledger.iter_claims(worker, retry_failed) if rcept_no in jobs)
+    fetch_reports, extract_reports, claimed = tee(claimed, 3)
+    results = ResultCache(results_path) if results_path else None
+    version = extractor_version(parser)
+    fetch = partial(fetch_document, ledger=ledger, results=results, version=version)
+    started = {} # rcept_no -> when its download was queued, for the per-report latency histogram
+    def queued_rcept_nos():
+        for report in fetch_reports:
+            started[report.get("rcept_no")] = time.perf_counter()
+            yield report.get("rcept_no")
+    rcept_nos = queued_rcept_nos()
+    if concurrency > 1:
+        documents = download_in_order(rcept_nos, concurrency, requests_per_second, fetch)
+    else:
+        documents = ((rcept_no, fetch(rcept_no)) for rcept_no in rcept_nos)
+    if parse_workers > 0:
+        details = extract_in_order(extract_reports, documents, parse_workers, parser, extract_job)
+    else:
+        details = (extract_job(report, fetched, parser) for report, (_, fetched) in zip(extract_reports, documents))
+
+    last_company = None
+    with JsonLinesWriter(output, append=resuming) as sink:
+        for report, (state, table_data, job_snapshot, extracted) in zip(claimed, details):
             rcept_no = report.get("rcept_no")
-
-            tables = unpack(rcept_no)
-            table_data = extract_table_data(report, tables)
-
-            batch_results.append(
-                {
-                    "corp_name": corp_name,
-                    "stock_code": stock_code,
-                    "corp_cls": corp_cls,
-                    "rcept_no": rcept_no,
-                    "table_data": table_data,
-                }
-            )
-        company_counter += 1
-
-        if company_counter % BATCH_SIZE == 0:
-            save_batch(batch_results, batch_index)
-            batch_results = []
-            batch_index += 1
-
-    if batch_results:
-        save_batch(batch_results, batch_index)
+            company_index, company, _ = jobs[rcept_no]
+            if company_index != last_company and company_index % 10 == 0:
+                print(f"Processing company {company_index}")
+            last_company = company_index
+            run_metrics.merge(job_snapshot)
+            run_metrics.count(f"reports_{state}")
+
+            if state == FAILED:
+                print(f"Failed {rcept_no}: {table_data}")
+                ledger.mark(rcept_no, FAILED, table_data)
+            else:
+                # written as soon as it is extracted, so memory stays flat and a crash loses at most this record
+                with run_metrics.timer('write'):
+                    sink.write(dict(company, rcept_no=rcept_no, table_data=table_data))
+                if extracted is not None and results is not None: results.put(rcept_no, version, extracted)
+                ledger.mark(rcept_no, state)
+            run_metrics.observe('report_latency_seconds', time.perf_counter() - started.pop(rcept_no))
+
+    ledger_counts = ledger.counts()
+    print(f"Saved {sink.count} reports to {output}; ledger {ledger_counts}")
+    ledger.close()
+    if results is not None: results.close()
+
+    run = {"start_timestamp_seconds": run_start, "duration_seconds": time.time() - run_start, "reports": sink.count, "ledger": ledger_counts}
+    if shard is not None: run["shard"] = f"{shard[0]}/{shard[1]}"
+    run_metrics.write_json(metrics_json, run)
+    run_metrics.write_prometheus(metrics_prom, run, {"shard": run["shard"]} if shard is not None else None)
+    stages = run_metrics.snapshot()["stages"]
+    print("Stage seconds: " + ", ".join(f"{stage} {totals['seconds']:.1f}" for stage, totals in stages.items()) + f"; metrics in {metrics_json}, {metrics_prom}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="Extract bond terms of every report in " + GROUPED_FILE)
+    arg_parser.add_argument("--parser", choices=list(PARSER_ENGINES), default=PARSER, help="BeautifulSoup engine for the documents")
+    arg_parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="document downloads in flight; 1 downloads sequentially")
+    arg_parser.add_argument("--requests-per-second", type=float, default=REQUESTS_PER_SECOND, help="download rate ceiling; 0 disables it")
+    arg_parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="worker processes for parsing; 0 parses in this process")
+    arg_parser.add_argument("--retry-failed", action="store_true", help="process the reports the ledger marks as failed, each once")
+    arg_parser.add_argument("--worker", default=WORKER, help="ledger claim owner; distinct per parallel worker")
+    arg_parser.add_argument("--ledger", default=LEDGER_FILE)
+    arg_parser.add_argument("--output", default=REPORTS_FILE)
+    arg_parser.add_argument("--results", default=RESULTS_FILE, help="extraction result cache")
+    arg_parser.add_argument("--no-result-cache", action="store_true", help="parse every report even if a cached result exists")
+    arg_parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                            help="process only shard i of N (0-based); merge the outputs with sharding.py N")
+    args = arg_parser.parse_args()
+    main(concurrency=args.concurrency, requests_per_second=args.requests_per_second, parse_workers=args.parse_workers,
+         parser=args.parser, retry_failed=args.retry_failed, worker=args.worker, ledger_path=args.ledger, output=args.output,
+         results_path=None if args.no_result_cache else args.results, shard=args.shard)
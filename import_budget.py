@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+'''
+### Purpose ###
+    모듈 import 시간 예산 점검 코드 (python -X importtime 기반)
+    usage: python import_budget.py   (예산 초과 또는 금지된 무거운 모듈이 로드되면 exit code 1)
+'''
+
+# module -> cumulative import time budget in milliseconds
+IMPORT_BUDGETS_MS = {
+    'basics': 30,
+    'sub': 40,
+    'fetch_full_B001_list': 30,
+}
+# heavy dependencies that must only load on the code paths that use them
+LAZY_MODULES = ['requests', 'bs4', 'pandas', 'lxml']
+REPORT_TOP = 8
+RUNS = 3 # best of N, to smooth out a cold disk cache
+
+def import_times(module: str) -> tuple:
+    '''
+    input: module name
+    output: ([(cumulative us, self us, imported name)] for the module and everything it pulled in, module last;
+             heavy modules present after the import)
+    '''
+    code = f"import {module}, sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(cumulative_us), int(self_us), name.strip()))
+    # the module is the last top-level entry; its imports are the nested entries just before it
+    start = len(rows) - 1
+    while start > 0 and rows[start - 1][0] > 0: start -= 1
+    rows = [(cumulative_us, self_us, name) for _, cumulative_us, self_us, name in rows[start:]]
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return rows, loaded
+
+def check_module(module: str, budget_ms: float) -> bool:
+    best_rows, loaded = None, []
+    for _ in range(RUNS):
+        rows, loaded = import_times(module)
+        if best_rows is None or rows[-1][0] < best_rows[-1][0]: best_rows = rows
+    total_ms = best_rows[-1][0] / 1000 # the module itself is reported last
+    ok = total_ms <= budget_ms and not loaded
+    print(f"{'OK  ' if ok else 'FAIL'} {module}: {total_ms:.1f} ms (budget {budget_ms} ms)")
+    if loaded: print(f"     loads heavy modules at import: {', '.join(loaded)}")
+    for cumulative_us, self_us, name in sorted(best_rows, reverse=True)[1:REPORT_TOP + 1]:
+        print(f"     {cumulative_us / 1000:7.1f} ms  {name}")
+    return ok
+
+if __name__ == "__main__":
+    results = [check_module(module, budget_ms) for module, budget_ms in IMPORT_BUDGETS_MS.items()]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,157 @@
+import sqlite3
+import sys
+import threading
+import time
+
+'''
+### Purpose ###
+    get_full_reports 작업 상태를 rcept_no 단위로 기록하는 SQLite 장부
+    pending -> downloaded -> extracted / empty / failed 로 상태를 남겨, 중단된 실행은 남은 건부터 이어 받고
+    실패한 건만 골라 다시 처리할 수 있다. 여러 worker 가 같은 장부에서 겹치지 않게 작업을 가져간다 (claim)
+    usage: python job_ledger.py [ledger file]   (상태별 건수와 실패 목록 출력)
+'''
+
+LEDGER_FILE = "reports_ledger.sqlite3"
+CLAIM_BATCH = 50        # rcept_no handed to a worker per claim
+CLAIM_TIMEOUT = 3600.0  # seconds after which another worker may take over a claim (its worker likely died)
+
+PENDING = "pending"
+DOWNLOADED = "downloaded"   # archive fetched, extraction not finished
+EXTRACTED = "extracted"
+EMPTY = "empty"             # document parsed but the bond-terms table was not found
+FAILED = "failed"
+DONE_STATES = (EXTRACTED, EMPTY)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    rcept_no   TEXT PRIMARY KEY,
+    seq        INTEGER NOT NULL,   -- position in the input, claims are handed out in this order
+    state      TEXT NOT NULL DEFAULT 'pending',
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    error      TEXT,
+    worker     TEXT,
+    claimed_at REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_seq ON jobs (state, seq);
+'''
+
+class JobLedger:
+    '''
+    jobs table in a SQLite file. One connection per ledger, shared by the download threads under a lock;
+    separate processes each open their own ledger on the same file and claim work inside IMMEDIATE transactions.
+    '''
+    def __init__(self, path: str = LEDGER_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL") # readers do not block the worker that is claiming
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+    def add(self, rcept_nos) -> int:
+        '''
+        input: rcept_no in processing order
+        output: number of new jobs; rcept_no already in the ledger keep their state
+        '''
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                start = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM jobs").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (rcept_no, seq, updated_at) VALUES (?, ?, ?)",
+                    ((rcept_no, start + idx, time.time()) for idx, rcept_no in enumerate(rcept_nos)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def started(self) -> bool:
+        '''True once any job has been claimed or has left pending'''
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM jobs WHERE state != ? OR worker IS NOT NULL LIMIT 1", (PENDING,)).fetchone()
+        return row is not None
+
+    def release(self, worker: str) -> int:
+        '''Hand back claims held by worker, e.g. left over from a run of the same worker that crashed'''
+        with self._lock:
+            return self._conn.execute("UPDATE jobs SET worker = NULL, claimed_at = NULL WHERE worker = ?", (worker,)).rowcount
+
+    def claim(self, worker: str, limit: int = CLAIM_BATCH, retry_failed: bool = False, failed_before: float = None) -> list:
+        '''
+        input: worker id, batch size and whether to take failed jobs instead of unfinished ones;
+               with retry_failed, only jobs that failed before failed_before (default: now)
+        output: claimed rcept_no in input order; empty when nothing is left
+        '''
+        states = (FAILED,) if retry_failed else (PENDING, DOWNLOADED)
+        now = time.time()
+        # a job that fails again during a retry pass is marked after the pass started, so the pass does not take it back
+        cutoff = " AND updated_at < ?" if retry_failed else ""
+        cutoff_params = (now if failed_before is None else failed_before,) if retry_failed else ()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE") # the select and the update below are one step for every other worker
+            try:
+                rows = self._conn.execute(
+                    f"SELECT rcept_no FROM jobs WHERE state IN ({','.join('?' * len(states))})"
+                    " AND (worker IS NULL OR claimed_at < ?)" + cutoff + " ORDER BY seq LIMIT ?",
+                    (*states, now - CLAIM_TIMEOUT, *cutoff_params, limit),
+                ).fetchall()
+                rcept_nos = [rcept_no for rcept_no, in rows]
+                self._conn.executemany(
+                    "UPDATE jobs SET worker = ?, claimed_at = ? WHERE rcept_no = ?",
+                    ((worker, now, rcept_no) for rcept_no in rcept_nos),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rcept_nos
+
+    def iter_claims(self, worker: str, retry_failed: bool = False, batch: int = CLAIM_BATCH):
+        '''
+        input: worker id and whether to retry failed jobs only
+        output: yields rcept_no claimed batch by batch until the ledger has no more work;
+                a retry pass takes only the jobs that had failed when it started, each once
+        '''
+        pass_start = time.time()
+        while True:
+            rcept_nos = self.claim(worker, batch, retry_failed, pass_start)
+            if not rcept_nos: return
+            yield from rcept_nos
+
+    def mark(self, rcept_no: str, state: str, error: str = None):
+        '''
+        input: rcept_no, new state and the error message for failed jobs
+        A downloaded job stays claimed; every other state ends the claim
+        '''
+        with self._lock:
+            if state == DOWNLOADED:
+                self._conn.execute("UPDATE jobs SET state = ?, error = NULL, updated_at = ? WHERE rcept_no = ?",
+                                   (state, time.time(), rcept_no))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, attempts = attempts + 1, worker = NULL, claimed_at = NULL, updated_at = ?"
+                    " WHERE rcept_no = ?",
+                    (state, error, time.time(), rcept_no),
+                )
+
+    def counts(self) -> dict:
+        '''{state: number of jobs}'''
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state ORDER BY state").fetchall())
+
+    def failures(self) -> list:
+        '''[(rcept_no, attempts, error)] of failed jobs in input order'''
+        with self._lock:
+            return self._conn.execute("SELECT rcept_no, attempts, error FROM jobs WHERE state = ? ORDER BY seq", (FAILED,)).fetchall()
+
+if __name__ == "__main__":
+    ledger = JobLedger(sys.argv[1] if len(sys.argv) > 1 else LEDGER_FILE)
+    print(ledger.counts())
+    for rcept_no, attempts, error in ledger.failures():
+        print(f"{rcept_no}  attempts={attempts}  {error}")
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+'''
+### Purpose ###
+    파이프라인 단계별 소요 시간, 카운터(다운로드 바이트, 파싱한 표, cp949 디코딩 fallback, 빈 추출 등),
+    rcept_no 별 처리 지연 히스토그램을 모으는 계측 코드
+    get_full_reports.main 종료 시 JSON 요약(METRICS_JSON)과 Prometheus text 파일(METRICS_PROM)로 기록한다
+'''
+
+METRICS_JSON = "run_metrics.json"
+METRICS_PROM = "run_metrics.prom"   # node_exporter textfile collector format
+PROM_PREFIX = "mezz"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0) # seconds; +Inf is implicit
+
+class Metrics:
+    '''
+    Counters, stage timers (total seconds and calls) and histograms; safe to share between threads.
+    snapshot() is plain JSON so a worker process can return it and the parent merge() it
+    '''
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.stages = {}        # stage -> [seconds, calls]
+        self.histograms = {}    # name -> [count per bucket (last is +Inf), sum, count]
+
+    def count(self, name: str, n: int = 1):
+        with self._lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try: yield
+        finally: self.add_time(stage, time.perf_counter() - start)
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self.histograms.setdefault(name, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            index = next((idx for idx, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "stages": {stage: {"seconds": seconds, "calls": calls} for stage, (seconds, calls) in self.stages.items()},
+                "histograms": {name: {"buckets": list(self.buckets), "counts": list(counts), "sum": total, "count": n}
+                               for name, (counts, total, n) in self.histograms.items()},
+            }
+
+    def merge(self, snapshot: dict):
+        '''Add another Metrics' snapshot (e.g. from a worker process) into this one'''
+        for name, n in snapshot.get("counters", {}).items(): self.count(name, n)
+        for stage, totals in snapshot.get("stages", {}).items(): self.add_time(stage, totals["seconds"], totals["calls"])
+        with self._lock:
+            for name, data in snapshot.get("histograms", {}).items():
+                histogram = self.histograms.setdefault(name, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], data["counts"])]
+                histogram[1] += data["sum"]
+                histogram[2] += data["count"]
+
+    def write_json(self, path: str = METRICS_JSON, run: dict = None):
+        '''
+        input: output path and run-level fields (start time, duration, ...) stored under "run"
+        output: summary JSON; stage entries also get the mean seconds per call
+        '''
+        summary = dict(self.snapshot(), run=run or {})
+        for totals in summary["stages"].values():
+            totals["mean_seconds"] = totals["seconds"] / totals["calls"] if totals["calls"] else 0.0
+        _write_atomic(path, json.dumps(summary, ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str = METRICS_PROM, run: dict = None, labels: dict = None):
+        '''
+        input: output path, numeric run-level gauges and labels put on every sample (e.g. the shard)
+        output: Prometheus text exposition file, replaced atomically so a scraper never reads half of it
+        '''
+        snapshot = self.snapshot()
+        def with_labels(**extra):
+            pairs = dict(labels or {}, **extra)
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}" if pairs else ""
+        lines = []
+        for name, value in sorted((run or {}).items()):
+            if not isinstance(value, (int, float)): continue
+            lines += [f"# TYPE {PROM_PREFIX}_run_{name} gauge", f"{PROM_PREFIX}_run_{name}{with_labels()} {value}"]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {PROM_PREFIX}_{name}_total counter", f"{PROM_PREFIX}_{name}_total{with_labels()} {value}"]
+        if snapshot["stages"]:
+            lines.append(f"# HELP {PROM_PREFIX}_stage_seconds_total Time spent per pipeline stage")
+            lines.append(f"# TYPE {PROM_PREFIX}_stage_seconds_total counter")
+            lines += [f'{PROM_PREFIX}_stage_seconds_total{with_labels(stage=stage)} {totals["seconds"]:.6f}'
+                      for stage, totals in sorted(snapshot["stages"].items())]
+            lines.append(f"# TYPE {PROM_PREFIX}_stage_calls_total counter")
+            lines += [f'{PROM_PREFIX}_stage_calls_total{with_labels(stage=stage)} {totals["calls"]}'
+                      for stage, totals in sorted(snapshot["stages"].items())]
+        for name, data in sorted(snapshot["histograms"].items()):
+            metric = f"{PROM_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(list(data["buckets"]) + ["+Inf"], data["counts"]):
+                cumulative += n
+                lines.append(f'{metric}_bucket{with_labels(le=bound)} {cumulative}')
+            lines += [f"{metric}_sum{with_labels()} {data['sum']:.6f}", f"{metric}_count{with_labels()} {data['count']}"]
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: f.write(text)
+    os.replace(tmp_path, path)
+
+_default_metrics = Metrics()
+_local = threading.local()
+
+def current() -> Metrics:
+    '''Metrics this thread records into: the one set by recording(), otherwise the process-wide default'''
+    return getattr(_local, "metrics", None) or _default_metrics
+
+def default_metrics() -> Metrics:
+    return _default_metrics
+
+def reset_default() -> Metrics:
+    '''Install a fresh process-wide default, e.g. at the start of each run so a second run does not add to the first'''
+    global _default_metrics
+    _default_metrics = Metrics()
+    return _default_metrics
+
+@contextmanager
+def recording(metrics: Metrics):
+    '''Route this thread's count()/timer()/observe() calls into metrics, e.g. one per job in a worker process'''
+    previous = getattr(_local, "metrics", None)
+    _local.metrics = metrics
+    try: yield metrics
+    finally: _local.metrics = previous
+
+def count(name: str, n: int = 1):
+    current().count(name, n)
+
+def timer(stage: str):
+    return current().timer(stage)
+
+def observe(name: str, value: float):
+    current().observe(name, value)
@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+import zlib
+
+'''
+### Purpose ###
+    추출 결과를 한 건씩 바로 기록하는 JSON Lines 출력 (파일명이 .gz 로 끝나면 NDJSON.gz)
+    한 줄에 보고서 한 건씩 append 하고 매 건 flush, FSYNC_EVERY 건마다 fsync 하므로
+    중간에 종료되어도 잃는 것은 쓰던 한 건뿐이다. iter_records 는 파일 전체를 올리지 않고 한 건씩 읽는다
+'''
+
+REPORTS_FILE = "reports_details.jsonl"
+FSYNC_EVERY = 1   # records between fsyncs; 1 syncs every record, 0 only on close
+
+def _open(path: str, mode: str, compressed: bool = None):
+    if path.endswith('.gz') if compressed is None else compressed: return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def _repair(path: str):
+    '''
+    Drop a record cut off by a crash so the next append starts on a fresh line.
+    Plain files are truncated after their last newline; a damaged .gz is rewritten from its readable records.
+    '''
+    if not os.path.exists(path) or os.path.getsize(path) == 0: return
+    if path.endswith('.gz'):
+        try:
+            with gzip.open(path, 'rb') as f:
+                while f.read(1 << 20): pass
+            return
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            records = list(iter_records(path))
+        tmp_path = path + '.tmp'
+        with _open(tmp_path, 'w', compressed=True) as f:
+            for record in records: f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+        return
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 1))
+        if f.read(1) == b'\n': return
+        # walk back to the last newline; records are small, so this reads at most a few blocks
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+class JsonLinesWriter:
+    '''
+    Append-only sink: write() puts one record on its own line and flushes it immediately.
+    Use as a context manager; close() always syncs to disk.
+    '''
+    def __init__(self, path: str = REPORTS_FILE, append: bool = True, fsync_every: int = FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.count = 0
+        if append: _repair(path)
+        self._file = _open(path, 'a' if append else 'w')
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush() # a gzip stream is sync-flushed, so every finished record stays readable
+        self.count += 1
+        if self.fsync_every > 0 and self.count % self.fsync_every == 0: self._sync()
+
+    def _sync(self):
+        raw = self._file.buffer if hasattr(self._file, 'buffer') else self._file
+        raw.flush()
+        fileobj = getattr(raw, 'fileobj', None) # GzipFile wraps the real file
+        if fileobj is not None: fileobj.flush()
+        os.fsync((fileobj or raw).fileno())
+
+    def close(self):
+        if self._file.closed: return
+        self._file.flush()
+        self._sync()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _iter_lines(path: str):
+    # bytes are split on newlines before decoding, so a record cut inside a multi-byte character is only the unfinished tail.
+    # For .gz, read1 hands back what has been decompressed so far, so lines before a truncated tail are not lost
+    pending = b''
+    with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+        try:
+            while True:
+                chunk = f.read1(65536)
+                if not chunk: break
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                for line in lines: yield line.decode('utf-8') + '\n'
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            pass # stream ended inside the last record
+    if pending: yield pending.decode('utf-8', errors='replace')
+
+def iter_records(path: str = REPORTS_FILE):
+    '''
+    input: .jsonl or .jsonl.gz file
+    output: yields each record in file order without loading the file; a record cut off by a crash is skipped
+    '''
+    for line in _iter_lines(path):
+        if not line.endswith('\n'): return # unfinished last record
+        if line.strip(): yield json.loads(line)
@@ -0,0 +1,118 @@
+import hashlib
+import inspect
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+'''
+### Purpose ###
+    rcept_no 별 문서 추출 결과(채권 조건 필드, 이름 변환 전 발행대상 행)를 보관하는 SQLite 캐시
+    결과마다 추출 코드와 설정의 해시(code_version)를 함께 저장해, 추출 코드가 바뀐 결과만 다시 파싱한다
+    CORPNAMES 이름 변환은 캐시에서 읽은 행에 매번 다시 적용하므로, CORPNAMES 수정은 캐시를 무효화하지 않는다
+    usage: python result_cache.py [cache file]   (버전별 결과 수 출력)
+'''
+
+RESULTS_FILE = "extraction_cache.sqlite3"
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    rcept_no   TEXT PRIMARY KEY,
+    version    TEXT NOT NULL,   -- code_version of the extractor that produced data
+    data       TEXT NOT NULL,   -- JSON
+    updated_at REAL
+);
+'''
+
+_source_warned = False # the missing-source warning is printed once per process
+
+def _describe_const(const) -> str:
+    if inspect.iscode(const): return _describe_code(const)
+    if isinstance(const, tuple): return "(" + ", ".join(map(_describe_const, const)) + ")"
+    if isinstance(const, frozenset): return "frozenset({" + ", ".join(sorted(map(_describe_const, const))) + "})" # set order is salted per process
+    return repr(const)
+
+def _describe_code(code) -> str:
+    '''bytecode, constants and names; nested code objects (lambdas, comprehensions) are described the same way'''
+    return f"{code.co_name}:{code.co_code.hex()}:{_describe_const(code.co_consts)}:{code.co_names}"
+
+def _describe_compiled(part) -> str:
+    '''
+    input: function, method or class whose source is not available, e.g. in the frozen EXE (basics.resource_dir)
+    output: description from the compiled code, the same in every process of the same build; repr() carries a memory address
+    '''
+    global _source_warned
+    if not _source_warned:
+        _source_warned = True
+        print(f"Warning: source of {part.__module__}.{part.__qualname__} is not available; "
+              "the result cache version is taken from bytecode, which changes with the Python version")
+    if inspect.ismethod(part): part = part.__func__
+    name = f"{part.__module__}.{part.__qualname__}"
+    if inspect.isfunction(part): return f"{name} {_describe_code(part.__code__)} {_describe(part.__defaults__)}"
+    members = []
+    for key, value in sorted(vars(part).items()):
+        if key in ('__dict__', '__weakref__', '__module__', '__qualname__', '__doc__'): continue
+        if isinstance(value, (staticmethod, classmethod)): value = value.__func__
+        if isinstance(value, property): value = (value.fget, value.fset, value.fdel)
+        members.append(f"{key}={_describe(value)}")
+    return f"class {name}(" + ", ".join(members) + ")"
+
+def _describe(part) -> str:
+    if inspect.isfunction(part) or inspect.isclass(part) or inspect.ismethod(part):
+        try: return inspect.getsource(part)
+        except (OSError, TypeError): return _describe_compiled(part)
+    if inspect.isbuiltin(part): # e.g. ' '.join; the default repr carries a memory address
+        return f"{getattr(part, '__self__', None)!r}.{part.__name__}"
+    if isinstance(part, (list, tuple)): return "[" + ", ".join(map(_describe, part)) + "]"
+    if isinstance(part, dict): return "{" + ", ".join(f"{key!r}: {_describe(value)}" for key, value in part.items()) + "}"
+    slots = getattr(type(part), '__slots__', None)
+    if slots: return f"{type(part).__name__}(" + ", ".join(_describe(getattr(part, name, None)) for name in slots) + ")"
+    return repr(part)
+
+def code_version(*parts) -> str:
+    '''
+    input: functions, classes, slotted objects and plain settings that shape a result
+    output: short hash of their source code and values; editing any of them gives a new version
+    '''
+    digest = hashlib.sha256()
+    for part in parts: digest.update(_describe(part).encode('utf-8') + b'\0')
+    return digest.hexdigest()[:16]
+
+class ResultCache:
+    '''
+    results table in a SQLite file, one row per rcept_no holding the newest version's data.
+    Shared by the download threads (get) and the main thread (put) under a lock.
+    '''
+    def __init__(self, path: str = RESULTS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+    def get(self, rcept_no: str, version: str):
+        '''
+        input: rcept_no and the current extractor version
+        output: stored data, or None when there is none or it came from another version
+        '''
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM results WHERE rcept_no = ? AND version = ?", (rcept_no, version)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, rcept_no: str, version: str, data):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (rcept_no, version, data, updated_at) VALUES (?, ?, ?, ?)",
+                               (rcept_no, version, json.dumps(data, ensure_ascii=False), time.time()))
+
+    def versions(self) -> dict:
+        '''{version: number of results}'''
+        with self._lock:
+            return dict(self._conn.execute("SELECT version, COUNT(*) FROM results GROUP BY version").fetchall())
+
+if __name__ == "__main__":
+    cache = ResultCache(sys.argv[1] if len(sys.argv) > 1 else RESULTS_FILE)
+    print(cache.versions())
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import zlib
+
+from report_sink import JsonLinesWriter, iter_records, REPORTS_FILE
+
+'''
+### Purpose ###
+    get_full_reports 의 회사 루프를 corp_code 해시(crc32)로 N 개 shard 로 나눠 여러 프로세스 / 여러 서버에서 돌리는 코드
+    shard 마다 출력, 장부, 지표 파일을 따로 쓰고(<이름>.shard-i-of-N.<확장자>), API 키가 N 개 이상이면 키도 나눠 쓴다
+    merge_shards 는 shard 출력을 GROUPED_FILE 의 회사 / 공시 순서로 합쳐, 한 프로세스로 돌린 것과 같은 순서의 결과 하나를 만든다
+    usage: python get_full_reports.py --shard 0/4   (서버나 코어마다 0/4, 1/4, 2/4, 3/4 중 하나)
+           python sharding.py 4                      (shard 출력을 모아 reports_details.jsonl 하나로 합치기)
+'''
+
+def parse_shard(text: str) -> tuple:
+    '''
+    input: "i/N" with 0 <= i < N
+    output: (i, N)
+    '''
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    if not 0 <= index < count: raise ValueError(f"shard index must be in 0..{count - 1}, got {text!r}")
+    return index, count
+
+def shard_of(corp_code: str, count: int) -> int:
+    '''crc32 rather than hash(), which is salted per process and would put a company in different shards on each host'''
+    return zlib.crc32((corp_code or "").encode('utf-8')) % count
+
+def in_shard(corp_code: str, shard: tuple) -> bool:
+    return shard is None or shard_of(corp_code, shard[1]) == shard[0]
+
+def shard_path(path: str, shard: tuple) -> str:
+    '''
+    input: output path and (i, N), or None when not sharded
+    output: e.g. reports_details.shard-0-of-4.jsonl; a .gz suffix stays last so the file is still compressed
+    '''
+    if shard is None: return path
+    root, ext = os.path.splitext(path)
+    if ext == '.gz':
+        root, inner_ext = os.path.splitext(root)
+        ext = inner_ext + ext
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+def shard_keys(keys: list, shard: tuple) -> list:
+    '''Every N-th key for shard i, so shards running side by side do not share quota; all keys when there are fewer than N'''
+    if shard is None or len(keys) < shard[1]: return list(keys)
+    return keys[shard[0]::shard[1]]
+
+def report_order(grouped_data: dict) -> dict:
+    '''
+    input: grouped_by_corp_code of GROUPED_FILE
+    output: rcept_no -> (company index, report index), the order get_full_reports.main processes them in without shards
+    '''
+    order = {}
+    for company_index, corp_data in enumerate(grouped_data.values()):
+        for report_index, report in enumerate(corp_data.get("reports") or []):
+            order.setdefault(report.get("rcept_no"), (company_index, report_index))
+    return order
+
+def merge_shards(count: int, output: str = REPORTS_FILE, grouped_file: str = None, inputs: list = None) -> int:
+    '''
+    input: number of shards, merged output path, GROUPED_FILE and the shard outputs (default: shard_path of output)
+    output: number of records written. Records are ordered as in grouped_file; a rcept_no written twice
+            (a record repeated after a crash between write and ledger update) keeps its last copy
+    '''
+    if grouped_file is None:
+        from get_full_reports import GROUPED_FILE
+        grouped_file = GROUPED_FILE
+    if inputs is None: inputs = [shard_path(output, (index, count)) for index in range(count)]
+    missing = [path for path in inputs if not os.path.exists(path)]
+    if missing: raise FileNotFoundError(f"missing shard outputs: {', '.join(missing)}")
+
+    records = {}
+    for path in inputs:
+        for record in iter_records(path): records[record.get("rcept_no")] = record
+
+    with open(grouped_file, "r", encoding="utf-8") as f: order = report_order(json.load(f).get("grouped_by_corp_code", {}))
+    unknown = (len(order), 0) # reports missing from grouped_file go last, by rcept_no
+    ordered = sorted(records.values(), key=lambda record: (order.get(record.get("rcept_no"), unknown), record.get("rcept_no") or ""))
+    with JsonLinesWriter(output, append=False, fsync_every=0) as sink:
+        for record in ordered: sink.write(record)
+    return len(ordered)
+
+if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="Merge the outputs of get_full_reports.py --shard i/N runs")
+    arg_parser.add_argument("count", type=int, help="number of shards N")
+    arg_parser.add_argument("--output", default=REPORTS_FILE, help="merged output; shard outputs are read from its shard paths")
+    arg_parser.add_argument("--grouped", default=None, help="grouped report list that defines the order")
+    arg_parser.add_argument("inputs", nargs="*", help="shard outputs, if not at the default shard paths")
+    args = arg_parser.parse_args()
+    try:
+        written = merge_shards(args.count, args.output, args.grouped, args.inputs or None)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Merged {written} reports from {args.count} shards into {args.output}")
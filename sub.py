@@ -1,9 +1,11 @@
-import pandas as pd
 import re
 import sys
 import os
+from collections import deque
+from functools import lru_cache
 
 from basics import parse_number
+from document import as_document
 
 CORPNAMES = {
     "1": {
@@ -71,7 +73,109 @@ def preprocess_fundname(fundname: str) -> str:
         fundname = fundname.replace(replacement, '')
     return fundname
 
+RESOLVER_MEMO_SIZE = 8192 # distinct fund names remembered; the same funds show up across many reports
+
+def normalize_fundname(fundname: str) -> str:
+    fundname = fundname.replace(' ','')
+    replacements = [' ', '주식회사', '(주)', '㈜']
+    for replacement in replacements:
+        fundname = fundname.replace(replacement, '')
+    return fundname
+
+class CorpNameResolver:
+    '''
+    CORPNAMES compiled once for fundname_to_corpname.
+    The prefix match is one dict lookup per alias length, and the aliases that appear in the rest of the
+    name are found in a single pass of an Aho-Corasick automaton over every alias.
+    Results are memoized per fund name.
+    '''
+    def __init__(self, corpnames: dict = CORPNAMES, memo_size: int = RESOLVER_MEMO_SIZE):
+        # longest aliases first, as in the scan it replaces
+        self.prefix_maps = [(i, corpnames[str(i)]) for i in range(len(corpnames), 0, -1)]
+        # every alias in the order the scan reports them: longest bucket first, then dict order
+        aliases = [(match, corp_name) for _, names in self.prefix_maps for match, corp_name in names.items()]
+        self.alias_names = [corp_name for _, corp_name in aliases]
+        self._build_automaton([match for match, _ in aliases])
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    def _build_automaton(self, aliases: list):
+        self.goto = [{}]    # node -> {char: node}; node 0 is the root
+        self.fail = [0]
+        self.output = [[]]  # node -> ranks (positions in self.alias_names) of aliases ending here
+        self.always = []    # ranks of empty aliases, which occur in every string
+        for rank, alias in enumerate(aliases):
+            if not alias:
+                self.always.append(rank)
+                continue
+            node = 0
+            for char in alias:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = nxt
+            self.output[node].append(rank)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[nxt] = self.goto[state].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def aliases_in(self, text: str) -> list:
+        '''
+        input: text
+        output: names of every alias contained in text, in CORPNAMES scan order (repeated aliases count once)
+        '''
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set(self.always)
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]: found.update(output[node])
+        return [self.alias_names[rank] for rank in sorted(found)]
+
+    def _resolve(self, fundname: str) -> str:
+        fundname = normalize_fundname(fundname)
+
+        is_shingisa = False
+        if '신기술' in fundname and '조합' in fundname: is_shingisa = True
+
+        corp_found = ""
+        for i, names in self.prefix_maps:
+            corp_found = names.get(fundname[:i], "")
+            if corp_found:
+                corp_found = '-'.join([corp_found] + self.aliases_in(fundname[i:]))
+                break
+
+        if corp_found and is_shingisa: fundname = corp_found + " 신기사"
+        if corp_found and not is_shingisa: fundname = corp_found
+
+        return fundname
+
+_resolver = None
+
+def build_resolver(corpnames: dict = CORPNAMES) -> CorpNameResolver:
+    '''Rebuild the shared resolver, e.g. after editing CORPNAMES at runtime'''
+    global _resolver
+    _resolver = CorpNameResolver(corpnames)
+    return _resolver
+
 def fundname_to_corpname(fundname: str) -> str:
+    return (_resolver or build_resolver()).resolve(fundname)
+
+def fundname_to_corpname_scan(fundname: str) -> str:
+    '''Reference implementation scanning CORPNAMES directly; CorpNameResolver must match it'''
     corpnames = CORPNAMES
     fundname = fundname.replace(' ','')
     replacements = [' ', '주식회사', '(주)', '㈜']
@@ -112,148 +216,130 @@ def fundname_to_corpname_safe(fundname: str) -> str:
     if "-" in fundname: return preprocess_fundname(fundname)
     else: return fundname_to_corpname(fundname)
 
-def list_fund_participants(all_tables): 
+def extract_bonken_numbers(text):
+    if '(' in text and '본건' in text: # Check if text contains '(' and '본건'
+        # Handle both cases: "corpname+(본건#)" and "(본건#)+corpname"
+        if text.startswith('('):
+            before_paren = text.split(')')[0] if ')' in text else text
+            numbers = re.findall(r'\d+', before_paren) # find all numbers
+        else:
+            after_paren = text.split('(')[1] if '(' in text else text
+            numbers = re.findall(r'\d+', after_paren) # find all numbers
+        
+        if numbers: return '|'.join(numbers) # Join numbers with '|' separator
+    return text  
+
+def format_participants(totals):
+    '''
+    input: list of (corpname, amount in won)
+    output: "corpname amount(억), ..." text
+    '''
+    parts = []
+    for corp_name, amount in totals:
+        value = amount / 10**8
+        if value.is_integer():
+            value_str = f"{int(value)}"
+        else:
+            value_str = f"{value:.1f}"
+        parts.append(f"{corp_name} {value_str}")
+    return ', '.join(parts)
+
+def pad_row(row, width):
+    return row + [None] * (width - len(row))
+
+def participant_rows(all_tables):
+    '''
+    input: tables of a report (Document, list or lazy stream)
+    output: (participants, fund_rows) as read from the document before any name resolution, or None without both tables
+    First Table : fund name or bonken numbers | fiscal amount, one (text, amount) per row
+    Second Table : bonken number | fund name rows
+    Only lists, strings and numbers, so the result can be stored as JSON (result_cache) and resolved again later
+    '''
+    document = as_document(all_tables)
     first_table, second_table = None, None
-    for idx in range(len(all_tables) - 1, -1, -1): # Search from the end in reverse direction to find the LAST matching table
-        table = all_tables[idx]
-        table_text = table.get_text()
-        if '발행 대상자명' in table_text:
-            first_table = table
-            if idx + 1 < len(all_tables): second_table = all_tables[idx + 1]
-            else: second_table = None
-            break
+    matches = document.indexes('발행 대상자명')
+    if matches: # the LAST matching table and the one right after it
+        idx = matches[-1]
+        first_table = document.tables[idx]
+        if idx + 1 < len(document.tables): second_table = document.tables[idx + 1]
 
+    participants = [] # (fund name or bonken numbers, amount) per first table row
     if first_table is not None:
-        first_table_rows = []
-        thead = first_table.find('thead')
-        if thead:
-            for tr in thead.find_all('tr'):
-                cells = tr.find_all('th')
-                if cells:
-                    header_row = [cell.get_text(strip=True) for cell in cells]
-                    first_table_rows.append(header_row)
-        
-        tbody = first_table.find('tbody')
-        if tbody:
-            for tr in tbody.find_all('tr'):
-                all_cells = tr.find_all('te')
-                if all_cells:
-                    row = [cell.get_text(strip=True) for cell in all_cells]
-                    first_table_rows.append(row)
-        first_table_df = pd.DataFrame(first_table_rows)
-
-        if not first_table_df.empty and len(first_table_df.columns) >= 2 and len(first_table_df) > 0:
+        first_table_rows = first_table.cells('thead', 'th') + first_table.cells('tbody', 'te')
+        width = max((len(row) for row in first_table_rows), default=0)
+
+        if width >= 2:
             idx_col1 = -1
             idx_col2 = -1
-            for i, col in enumerate(first_table_df.iloc[0, :]):
+            for i, col in enumerate(pad_row(first_table_rows[0], width)): # a short header row raises here, as before
                 if '발행 대상자명' in col: idx_col1 = i
                 if '권면' in col or '총액' in col or '금액' in col: idx_col2 = i
             if idx_col1 != -1 and idx_col2 != -1:
-                first_table_filtered = first_table_df.iloc[1:, [idx_col1, idx_col2]].copy()
-            else:
-                first_table_filtered = pd.DataFrame(columns=['발행 대상자명', '권면'])
-            first_table_filtered.columns = ['발행 대상자명', '권면']
-            
-            def extract_bonken_numbers(text):
-                if '(' in text and '본건' in text: # Check if text contains '(' and '본건'
-                    # Handle both cases: "corpname+(본건#)" and "(본건#)+corpname"
-                    if text.startswith('('):
-                        before_paren = text.split(')')[0] if ')' in text else text
-                        numbers = re.findall(r'\d+', before_paren) # find all numbers
-                    else:
-                        after_paren = text.split('(')[1] if '(' in text else text
-                        numbers = re.findall(r'\d+', after_paren) # find all numbers
-                    
-                    if numbers: return '|'.join(numbers) # Join numbers with '|' separator
-                return text  
-
-            first_table_filtered['발행 대상자명'] = first_table_filtered['발행 대상자명'].apply(extract_bonken_numbers)
-            first_table_filtered['발행 대상자명'] = first_table_filtered['발행 대상자명'].apply(fundname_to_corpname)
-            first_table_filtered['권면'] = first_table_filtered['권면'].apply(parse_number)
-        else: first_table_filtered = pd.DataFrame(columns=['발행 대상자명', '권면'])
+                for row in first_table_rows[1:]:
+                    row = pad_row(row, width)
+                    participants.append((extract_bonken_numbers(row[idx_col1]), parse_number(row[idx_col2])))
     
+    fund_rows = [] # raw (구분, 본건펀드) rows of the second table
     if second_table is not None:
-        second_table_rows = []
-        tbody = second_table.find('tbody')
-        if tbody:
-            for tr in tbody.find_all('tr'):
-                cells = tr.find_all('td')
-                if cells:
-                    row = [cell.get_text(strip=True) for cell in cells]
-                    second_table_rows.append(row)
-        second_table_df = pd.DataFrame(second_table_rows)
-
-        if not second_table_df.empty and len(second_table_df.columns) >= 2 and len(second_table_df) > 0:
-            first_cell = str(second_table_df.iloc[0, 0])
-            has_header = not bool(re.search(r'\d', first_cell))            
-            if has_header:
-                second_table_filtered = second_table_df.iloc[1:, [0, 1]].copy()
-            else: 
-                second_table_filtered = second_table_df.iloc[:, [0, 1]].copy()
-            second_table_filtered.columns = ['구분', '본건펀드']
-
-            def extract_fund_numbers(text):
-                if '본건' in text or '펀드' in text:
-                    numbers = re.findall(r'\d+', text)
-                    if numbers: return numbers[0]
-                return text
-
-            second_table_filtered['구분'] = second_table_filtered['구분'].apply(extract_fund_numbers)
-            second_table_filtered['본건펀드'] = second_table_filtered['본건펀드'].apply(fundname_to_corpname)
+        fund_rows = second_table.cells('tbody', 'td')
+        width = max((len(row) for row in fund_rows), default=0)
 
-        '''
-        First Table : corpname(safe) or bonken numbers | fiscal amount
-        Second Table : bonken number | corpname
-        '''
+        if width >= 2:
+            has_header = not bool(re.search(r'\d', fund_rows[0][0]))
+            if any(len(row) < 2 for row in (fund_rows[1:] if has_header else fund_rows)):
+                raise ValueError("본건펀드 row without a fund name")
+            fund_rows = [pad_row(row, width) for row in fund_rows]
+        else:
+            fund_rows = []
 
-    if first_table is not None and second_table is not None:
-        def map_numbers_to_corpnames(text):
-            if '|' in text:
-                first_num = text.split('|')[0].strip()
-                if first_num.isdigit():
-                    if not second_table_df.empty and len(second_table_df.columns) >= 2 and len(second_table_df) > 0:
-                        matching_rows = second_table_df[second_table_df.iloc[:, 0].astype(str).str.contains(first_num, na=False)]
-                        if not matching_rows.empty and len(matching_rows) > 0:
-                            corp_name = matching_rows.iloc[0, 1]
-                            return fundname_to_corpname(str(corp_name))
-                return text
-            else:
-                # Handle single number
-                if text.isdigit():
-                    if not second_table_df.empty and len(second_table_df.columns) >= 2 and len(second_table_df) > 0:
-                        matching_rows = second_table_df[second_table_df.iloc[:, 0].astype(str).str.contains(text, na=False)]
-                        if not matching_rows.empty and len(matching_rows) > 0:
-                            corp_name = matching_rows.iloc[0, 1]
-                            return fundname_to_corpname(str(corp_name))
-                return text
-        
-        if not first_table_filtered.empty:
-            first_table_filtered['발행 대상자명'] = first_table_filtered['발행 대상자명'].apply(map_numbers_to_corpnames)
-            final_table = first_table_filtered.groupby('발행 대상자명')['권면'].sum().reset_index()
-            final_table = final_table.sort_values('권면', ascending=False).reset_index(drop=True)
-            total_amount = final_table['권면'].sum() / 10**8
-
-            def format_final_table_text(final_table):
-                parts = []
-                for _, row in final_table.iterrows():
-                    corp_name = str(row['발행 대상자명'])
-                    value = row['권면'] / 10**8
-                    if value.is_integer():
-                        value_str = f"{int(value)}"
-                    else:
-                        value_str = f"{value:.1f}"
-                    parts.append(f"{corp_name} {value_str}")
-                return ', '.join(parts)
-            
-            result_text = format_final_table_text(final_table)
-            return result_text, total_amount
+    # A first table without the 본건 fund table never produced a result (callers always fell back to "-")
+    if first_table is None or second_table is None: return None
+    return participants, fund_rows
+
+def resolve_participants(rows):
+    '''
+    input: participant_rows result
+    output: ("corpname amount, ..." sorted by amount, total amount in 억), names resolved with the current CORPNAMES
+    '''
+    if rows is None: return "-", 0.0
+    participants, fund_rows = rows
+
+    fund_names = {} # bonken number -> corpname, filled on first use
+    def bonken_to_corpname(number):
+        if number not in fund_names:
+            fund_names[number] = None
+            for row in fund_rows: # first row whose 구분 contains the number, e.g. '1' in '본건펀드1'
+                if number in row[0]:
+                    fund_names[number] = fundname_to_corpname(str(row[1]))
+                    break
+        return fund_names[number]
+
+    def map_numbers_to_corpnames(text):
+        number = text.split('|')[0].strip() if '|' in text else text
+        if number.isdigit():
+            corp_name = bonken_to_corpname(number)
+            if corp_name is not None: return corp_name
+        return text
     
-    elif first_table is not None:
-        total_amount = first_table_filtered['권면'].sum() / 10**8
-        return format_final_table_text(first_table_filtered), total_amount
-        
+    if participants:
+        totals = {}
+        for name, amount in participants:
+            name = map_numbers_to_corpnames(fundname_to_corpname(name))
+            totals[name] = totals.get(name, 0.0) + amount
+        totals = sorted(totals.items()) # grouped by name, then largest amount first (stable for ties)
+        totals.sort(key=lambda item: item[1], reverse=True)
+        total_amount = sum(amount for _, amount in totals) / 10**8
+        return format_participants(totals), total_amount
     return "-", 0.0
 
+def list_fund_participants(all_tables): 
+    '''
+    input: tables of a report (Document, list or lazy stream)
+    output: ("corpname amount, ..." sorted by amount, total amount in 억)
+    Tables hold a handful of rows, so this works on plain lists rather than DataFrames.
+    '''
+    return resolve_participants(participant_rows(all_tables))
+
 test_cases = [
     '20220706000148', '20231027000166', '20240216000966', '20230508000614', 
     '20240604000386', '20240726000500', '20230807000401', '20230829000575', '20230920000049', 
@@ -266,7 +352,7 @@ test_cases = [
     '20251001000656', '20250919000150'
 ]
 if __name__ == "__main__":
-    from main import unpack
+    from basics import unpack
     for test_case in test_cases[:5]:
         all_tables = unpack(test_case)
         result, total_amount = list_fund_participants(all_tables)